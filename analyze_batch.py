@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""Analyze a large JSONL or CSV list of foods offline, writing results as JSONL.
+
+Input rows use the API fields foodName, storageType and hoursSincePrepared
+(CSV files need a header row). Rows are streamed, so memory use does not
+depend on the file size. Each food is analyzed once per run: rows whose
+normalized name was already analyzed are skipped. Progress is checkpointed,
+and running the same command again after an interruption resumes where the
+last checkpoint left off.
+
+Usage:
+    python analyze_batch.py menu.jsonl results.jsonl
+    python analyze_batch.py catalog.csv results.jsonl --concurrency 16
+    python analyze_batch.py catalog.csv results.jsonl --fallback-only
+"""
+import argparse
+import csv
+import functools
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import gemini_food_analyzer as analyzer
+from gemini_scheduler import BATCH
+
+logger = logging.getLogger('gemini_food_analyzer.batch')
+
+CHECKPOINT_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS progress (
+        output_path TEXT PRIMARY KEY,
+        input_path TEXT NOT NULL,
+        rows_done INTEGER NOT NULL,
+        output_offset INTEGER NOT NULL
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS analyzed (food_key TEXT PRIMARY KEY)"
+]
+
+
+class Checkpoint:
+    """Rows processed, output size and analyzed food names, committed together
+
+    Names are recorded as their rows are written and committed with the row
+    count and output offset, so after a crash the three always agree. The
+    output file is truncated back to the committed offset on resume, which
+    drops any lines written after the last checkpoint.
+    """
+
+    def __init__(self, path, input_path, output_path):
+        self.conn = sqlite3.connect(path)
+        for statement in CHECKPOINT_SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+        self.input_path = os.path.abspath(input_path)
+        self.output_path = os.path.abspath(output_path)
+
+    def load(self):
+        """Return (rows_done, output_offset) from the last run on the same files"""
+        row = self.conn.execute("SELECT input_path, rows_done, output_offset FROM progress WHERE output_path = ?",
+                                (self.output_path,)).fetchone()
+        if row is None:
+            return 0, 0
+        if row[0] != self.input_path:
+            raise ValueError(f"{self.output_path} was written from {row[0]}; use another output file or checkpoint")
+        return row[1], row[2]
+
+    def reset(self):
+        """Forget the progress and analyzed names, for starting over"""
+        self.conn.execute("DELETE FROM progress WHERE output_path = ?", (self.output_path,))
+        self.conn.execute("DELETE FROM analyzed")
+        self.conn.commit()
+
+    def seen(self, food_key):
+        return self.conn.execute("SELECT 1 FROM analyzed WHERE food_key = ?", (food_key,)).fetchone() is not None
+
+    def record(self, food_key):
+        self.conn.execute("INSERT OR IGNORE INTO analyzed (food_key) VALUES (?)", (food_key,))
+
+    def save(self, rows_done, output_offset):
+        self.conn.execute(
+            "INSERT INTO progress (output_path, input_path, rows_done, output_offset) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(output_path) DO UPDATE SET rows_done = excluded.rows_done, "
+            "output_offset = excluded.output_offset",
+            (self.output_path, self.input_path, rows_done, output_offset)
+        )
+        self.conn.commit()
+
+
+def read_rows(path, input_format):
+    """Yield input rows as dicts, one at a time"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if input_format == "csv":
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield row if isinstance(row, dict) else {}
+
+
+def analyze_row(analyze, parsed):
+    """Analyze one parsed input row, returning an error record for invalid rows"""
+    food_name, storage_type, hours_since_prepared, error = parsed
+    if error:
+        return {"error": error}
+    try:
+        return analyze(food_name, storage_type, hours_since_prepared)
+    except Exception as e:
+        # One bad row must not abort the run
+        logger.error("Error analyzing %r: %s", food_name, e)
+        return {"error": str(e)}
+
+
+def submit_rows(rows, executor, analyze, checkpoint, in_flight, stats):
+    """Yield (row_number, food_key, future) in input order, skipping foods analyzed before
+
+    Duplicates yield a None future so the row still counts towards the checkpoint.
+    Invalid rows, including non-string names or storage types, get no key and are
+    written as error records, so they never hide a later valid row for the same food.
+    """
+    for row_number, row in rows:
+        parsed = analyzer.parse_food_request(row)
+        food_key = None if parsed[3] else analyzer.normalize_food_name(parsed[0])
+        if food_key and (food_key in in_flight or checkpoint.seen(food_key)):
+            stats["duplicates"] += 1
+            yield row_number, None, None
+            continue
+        if food_key:
+            in_flight.add(food_key)
+        yield row_number, food_key, executor.submit(analyze_row, analyze, parsed)
+
+
+def wait_for_model(timeout):
+    """Give the background model probe a chance to finish so early rows do not fall back"""
+    deadline = time.monotonic() + timeout
+    while analyzer.model_probe["state"] in ("pending", "probing") and time.monotonic() < deadline:
+        time.sleep(0.2)
+    return analyzer.gemini_model is not None
+
+
+def run(args):
+    input_format = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    checkpoint = Checkpoint(args.checkpoint or args.output + ".checkpoint", args.input, args.output)
+    try:
+        rows_done, output_offset = checkpoint.load()
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    if rows_done and not os.path.exists(args.output):
+        logger.warning("%s is missing, starting over", args.output)
+        checkpoint.reset()
+        rows_done, output_offset = 0, 0
+
+    if args.fallback_only:
+        analyze = analyzer.fallback_food_analysis
+    else:
+        # Offline runs can afford to wait for Gemini instead of answering with the fallback
+        analyzer.REQUEST_DEADLINE_SECONDS = args.deadline
+        if not wait_for_model(args.model_wait):
+            logger.warning("No Gemini model available yet, rows will use the fallback analysis until one is")
+        # Foods from rows in flight together are merged into batch-sized prompts
+        analyze = functools.partial(analyzer.analyze_food_with_gemini, priority=BATCH)
+
+    mode = 'r+b' if rows_done else 'wb'
+    stats = {"analyzed": 0, "duplicates": 0, "errors": 0}
+    started = time.monotonic()
+    with open(args.output, mode) as out, ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        out.seek(output_offset)
+        out.truncate()
+        if rows_done:
+            print(f"Resuming after row {rows_done}", file=sys.stderr)
+
+        rows = itertools.islice(enumerate(read_rows(args.input, input_format)), rows_done, None)
+        pending = deque()
+        in_flight = set()
+        for submitted in submit_rows(rows, executor, analyze, checkpoint, in_flight, stats):
+            pending.append(submitted)
+            # Keep at most `concurrency` rows in flight and write results in input order
+            while len(pending) > args.concurrency:
+                rows_done = write_result(out, pending.popleft(), checkpoint, in_flight, stats)
+                if rows_done % args.checkpoint_every == 0:
+                    out.flush()
+                    checkpoint.save(rows_done, out.tell())
+        while pending:
+            rows_done = write_result(out, pending.popleft(), checkpoint, in_flight, stats)
+        out.flush()
+        checkpoint.save(rows_done, out.tell())
+
+    elapsed = time.monotonic() - started
+    print(f"Done: {stats['analyzed']} analyzed, {stats['duplicates']} duplicates skipped, "
+          f"{stats['errors']} invalid rows in {elapsed:.1f}s", file=sys.stderr)
+
+
+def write_result(out, submitted, checkpoint, in_flight, stats):
+    """Write one finished row and return the number of rows done"""
+    row_number, food_key, future = submitted
+    if future is not None:
+        result = future.result()
+        stats["errors" if "error" in result else "analyzed"] += 1
+        out.write((json.dumps({"row": row_number, **result}) + "\n").encode('utf-8'))
+        if food_key:
+            if "error" not in result:
+                checkpoint.record(food_key)
+            in_flight.discard(food_key)
+    return row_number + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL or CSV file of foods")
+    parser.add_argument("output", help="JSONL file to write results to")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="input format (default: from the file extension)")
+    parser.add_argument("--concurrency", type=int, default=8, help="rows analyzed at the same time")
+    parser.add_argument("--checkpoint", help="checkpoint database (default: OUTPUT.checkpoint)")
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="rows between checkpoints")
+    parser.add_argument("--deadline", type=float, default=30, help="seconds to wait for Gemini per food")
+    parser.add_argument("--model-wait", type=float, default=60, help="seconds to wait for the model probe at startup")
+    parser.add_argument("--fallback-only", action="store_true", help="use the keyword analysis without calling Gemini")
+    args = parser.parse_args()
+    logging.getLogger('gemini_food_analyzer').setLevel(logging.WARNING)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
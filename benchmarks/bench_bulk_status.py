@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""Benchmark for the vectorized bulk status evaluator.
+
+Evaluates the same random batch of items with the per-item
+evaluate_food_safety loop and with BulkStatusEvaluator, checks that both
+agree, and prints the time per batch.
+
+Usage:
+    python benchmarks/bench_bulk_status.py [--items 50000] [--repeat 5]
+"""
+import argparse
+import logging
+import os
+import random
+import shutil
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCHMARK_DIR)
+
+import numpy as np  # noqa: E402
+
+import fake_gemini  # noqa: E402
+from load_test import isolated_environment  # noqa: E402
+
+# Only the analyzer's tables and evaluate_food_safety are needed; keep the import offline
+SCRATCH = isolated_environment()
+fake_gemini.install()
+
+import gemini_food_analyzer as analyzer  # noqa: E402
+from bulk_status import STATUS_NAMES, BulkStatusEvaluator  # noqa: E402
+
+
+def random_items(count, seed=42):
+    """Generate (category, storage_type, hours) tuples spread across every status"""
+    rng = random.Random(seed)
+    categories = list(analyzer.DEFAULT_EXPIRY)
+    storage_types = list(analyzer.STORAGE_TYPES)
+    return [(rng.choice(categories), rng.choice(storage_types), rng.uniform(0, 2500)) for _ in range(count)]
+
+
+def per_item(items, profiles):
+    return [analyzer.evaluate_food_safety(category, profiles[category], storage_type, hours, "fallback")
+            for category, storage_type, hours in items]
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=50000, help="items per batch")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, the best one is reported")
+    args = parser.parse_args()
+    logging.getLogger('gemini_food_analyzer').setLevel(logging.CRITICAL)
+    try:
+        run(args)
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+
+def run(args):
+    evaluator = BulkStatusEvaluator(analyzer.DEFAULT_EXPIRY, analyzer.DANGER_ZONE_HOURS, list(analyzer.STORAGE_TYPES))
+    profiles = {category: dict(analyzer.fallback_food_profile(category), food_category=category,
+                               shelf_life=analyzer.DEFAULT_EXPIRY[category],
+                               danger_zone_hours=analyzer.DANGER_ZONE_HOURS[category])
+                for category in analyzer.DEFAULT_EXPIRY}
+    items = random_items(args.items)
+
+    loop_seconds, expected = best_of(lambda: per_item(items, profiles), args.repeat)
+
+    start = time.perf_counter()
+    category_codes = evaluator.encode_categories([item[0] for item in items])
+    storage_codes = evaluator.encode_storage_types([item[1] for item in items])
+    hours = np.array([item[2] for item in items])
+    encode_seconds = time.perf_counter() - start
+
+    bulk_seconds, result = best_of(lambda: evaluator.evaluate(category_codes, storage_codes, hours), args.repeat)
+
+    statuses = [STATUS_NAMES[code] for code in result["status"]]
+    recommended = evaluator.storage_names(result["recommended_storage"])
+    mismatches = sum(
+        1 for analysis, status, remaining, storage in zip(expected, statuses, result["remaining_hours"], recommended)
+        if analysis["safety_status"] != status or analysis["recommended_storage"] != storage
+        or abs(analysis["remaining_hours"] - remaining) > 1e-9
+    )
+
+    print(f"items:            {args.items}")
+    print(f"per-item loop:    {loop_seconds * 1000:10.2f} ms")
+    print(f"encode columns:   {encode_seconds * 1000:10.2f} ms (once per batch)")
+    print(f"vectorized:       {bulk_seconds * 1000:10.2f} ms ({loop_seconds / bulk_seconds:.0f}x faster)")
+    print(f"mismatches:       {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""Micro-benchmark for the fallback food classifier.
+
+Measures per-call classification latency as the vocabulary grows, for the
+trie-based FoodClassifier and for the substring scan it replaced.
+
+Usage:
+    python benchmarks/bench_classifier.py [--calls 20000]
+"""
+import argparse
+import csv
+import os
+import random
+import string
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from food_classifier import CATEGORY_PRIORITY, FoodClassifier  # noqa: E402
+
+VOCABULARY_FILE = os.path.join(ROOT, 'data', 'food_vocabulary.csv')
+
+SAMPLE_FOODS = [
+    "chicken curry", "leftover vegetable biryani", "banana bread", "shrimp fried rice",
+    "greek yogurt with berries", "tomato soup", "mystery casserole from the office party",
+    "grilled salmon with lemon butter", "apple pie", "paneer tikka masala with garlic naan",
+]
+
+
+def load_terms():
+    with open(VOCABULARY_FILE, newline='', encoding='utf-8') as f:
+        return [(row["food"], row["category"]) for row in csv.DictReader(f)]
+
+
+def synthetic_terms(count, seed=42):
+    """Generate made-up multi-word terms to grow the vocabulary"""
+    rng = random.Random(seed)
+    terms = []
+    for _ in range(count):
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+                 for _ in range(rng.randint(1, 3))]
+        terms.append((" ".join(words), rng.choice(CATEGORY_PRIORITY)))
+    return terms
+
+
+def substring_classify(food_name, terms_by_category):
+    """The original approach: one any() substring scan per category"""
+    food_lower = food_name.lower()
+    for category, words in terms_by_category:
+        if any(word in food_lower for word in words):
+            return category
+    return None
+
+
+def time_per_call(func, calls):
+    start = time.perf_counter()
+    for index in range(calls):
+        func(SAMPLE_FOODS[index % len(SAMPLE_FOODS)])
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000, help="classifications per measurement")
+    args = parser.parse_args()
+
+    base_terms = load_terms()
+    print(f"{'vocabulary':>12} {'trie build ms':>14} {'trie us/call':>13} {'substring us/call':>18}")
+    for extra in (0, 10000, 100000):
+        terms = base_terms + synthetic_terms(extra)
+
+        start = time.perf_counter()
+        classifier = FoodClassifier()
+        classifier.add_terms(terms)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        trie_us = time_per_call(classifier.classify, args.calls)
+
+        grouped = {}
+        for term, category in terms:
+            grouped.setdefault(category, []).append(term)
+        terms_by_category = [(category, grouped.get(category, [])) for category in CATEGORY_PRIORITY]
+        # The substring scan is slow enough that fewer calls give a stable number
+        substring_us = time_per_call(lambda name: substring_classify(name, terms_by_category),
+                                     max(100, args.calls // 100))
+
+        print(f"{len(terms):>12} {build_ms:>14.1f} {trie_us:>13.2f} {substring_us:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
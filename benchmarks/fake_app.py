@@ -0,0 +1,9 @@
+"""WSGI entry point serving the analyzer against the fake Gemini backend.
+
+    gunicorn --chdir benchmarks fake_app:app
+"""
+import fake_gemini
+
+fake_gemini.install()
+
+from gemini_food_analyzer import app  # noqa: E402,F401
@@ -0,0 +1,99 @@
+"""Local stand-in for google.generativeai used by the benchmarks.
+
+The fake model answers with realistic food profiles after a configurable
+delay and can be told to fail or return malformed JSON at a given rate.
+Settings come from environment variables so gunicorn workers pick them up:
+
+    FAKE_GEMINI_LATENCY_MS   mean response latency (default 300)
+    FAKE_GEMINI_JITTER_MS    uniform jitter added to the latency (default 100)
+    FAKE_GEMINI_ERROR_RATE   fraction of calls that raise (default 0)
+    FAKE_GEMINI_MALFORMED_RATE  fraction of calls that return broken JSON (default 0)
+"""
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import google.generativeai as genai  # noqa: E402
+
+from food_classifier import FoodClassifier  # noqa: E402
+
+DEFAULT_EXPIRY_HOURS = {
+    "Meat": (2, 48, 2160), "Seafood": (1, 24, 1440), "Dairy": (2, 72, 720),
+    "Vegetables": (24, 168, 2160), "Fruits": (72, 240, 1440), "Grains": (72, 168, 2160),
+    "Baked Goods": (48, 168, 720), "Mixed": (2, 72, 1440)
+}
+
+_classifier = FoodClassifier.from_file(os.path.join(ROOT, 'data', 'food_vocabulary.csv'))
+
+
+class FakeUpstreamError(Exception):
+    """Simulated API failure such as a 429 or 503"""
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Drop-in replacement for genai.GenerativeModel"""
+
+    calls = 0
+    _calls_lock = threading.Lock()
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+        self.latency = float(os.getenv('FAKE_GEMINI_LATENCY_MS', 300)) / 1000
+        self.jitter = float(os.getenv('FAKE_GEMINI_JITTER_MS', 100)) / 1000
+        self.error_rate = float(os.getenv('FAKE_GEMINI_ERROR_RATE', 0))
+        self.malformed_rate = float(os.getenv('FAKE_GEMINI_MALFORMED_RATE', 0))
+
+    def generate_content(self, prompt, **kwargs):
+        with FakeGenerativeModel._calls_lock:
+            FakeGenerativeModel.calls += 1
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+        if random.random() < self.error_rate:
+            raise FakeUpstreamError("503 Service Unavailable (simulated)")
+        if random.random() < self.malformed_rate:
+            return FakeResponse('Sure! Here is the analysis: {"food_category": "Meat", "shelf_life": {')
+
+        food_names = re.findall(r'^\s*\d+\. (.+)$', prompt, re.MULTILINE)
+        if food_names:
+            return FakeResponse(json.dumps([profile_for(name) for name in food_names]))
+        match = re.search(r'Food: (.+)', prompt)
+        if match:
+            return FakeResponse(json.dumps(profile_for(match.group(1).strip())))
+        return FakeResponse("Hello! How can I help you today?")
+
+
+def profile_for(food_name):
+    """Build a plausible profile for a food name"""
+    category = _classifier.classify(food_name) or "Mixed"
+    room, fridge, frozen = DEFAULT_EXPIRY_HOURS[category]
+    return {
+        "food_name": food_name,
+        "food_category": category,
+        "ingredients": food_name.lower().split(),
+        "high_risk": category in ("Meat", "Seafood", "Dairy", "Mixed"),
+        "danger_zone_hours": min(room, 4),
+        "shelf_life": {"Room Temp": room, "Refrigerated": fridge, "Frozen": frozen},
+        "safety_guidelines": [f"Keep {category.lower()} at safe temperatures."]
+    }
+
+
+def install():
+    """Replace the real Gemini client with the fake one
+
+    On-disk state is not touched; load_test.isolated_environment points it at a scratch directory.
+    """
+    os.environ.setdefault('GEMINI_API_KEY', 'fake-key')
+    genai.configure = lambda *args, **kwargs: None
+    genai.GenerativeModel = FakeGenerativeModel
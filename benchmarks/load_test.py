@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+"""Load test for /api/food-safety against a local fake Gemini backend.
+
+Drives the endpoint at increasing concurrency, either in-process through the
+Flask test client or over HTTP against gunicorn workers, and reports
+throughput, latency percentiles and the fallback rate for each level.
+
+Usage:
+    python benchmarks/load_test.py --target flask --concurrency 1,8,32
+    python benchmarks/load_test.py --target gunicorn --workers 2 --threads 8
+    FAKE_GEMINI_ERROR_RATE=0.2 python benchmarks/load_test.py
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+FOODS = [
+    "chicken curry", "beef stew", "grilled salmon", "paneer tikka", "vegetable biryani",
+    "apple pie", "banana bread", "shrimp fried rice", "greek yogurt", "tomato soup",
+    "mac and cheese", "fruit salad", "pad thai", "lamb kofta", "egg fried rice",
+]
+STORAGE_TYPES = ["Room Temp", "Refrigerated", "Frozen"]
+
+
+def isolated_environment():
+    """Point the analyzer's on-disk state at a scratch directory"""
+    scratch = tempfile.mkdtemp(prefix="food-bench-")
+    os.environ['PROFILE_STORE_PATH'] = os.path.join(scratch, 'profile_store.db')
+    os.environ['INVENTORY_DB_PATH'] = os.path.join(scratch, 'inventory.db')
+    os.environ['FOOD_TABLE_PATH'] = os.path.join(scratch, 'food_table.bin')
+    os.environ['GEMINI_MODEL_STATE_FILE'] = os.path.join(scratch, '.gemini_model')
+    os.environ.setdefault('GEMINI_API_KEY', 'fake-key')
+    # The fake model has no quota; keep the scheduler from throttling the measurement
+    os.environ.setdefault('GEMINI_QUOTA_RPM', '1000000')
+    os.environ.setdefault('GEMINI_QUOTA_BURST', '10000')
+    return scratch
+
+
+def make_payloads(count, distinct_foods, seed):
+    """Build request bodies drawing from a pool of distinct food names"""
+    rng = random.Random(seed)
+    pool = [FOODS[i % len(FOODS)] + ("" if i < len(FOODS) else f" {i}") for i in range(distinct_foods)]
+    return [{
+        "foodName": rng.choice(pool),
+        "storageType": rng.choice(STORAGE_TYPES),
+        "hoursSincePrepared": rng.randint(0, 96)
+    } for _ in range(count)]
+
+
+class FlaskClient:
+    """Send requests through the Flask test client in this process"""
+
+    def __init__(self):
+        import fake_gemini
+        fake_gemini.install()
+        import gemini_food_analyzer
+        # Request logging would dominate the measurement
+        logging.getLogger('gemini_food_analyzer').setLevel(logging.CRITICAL)
+        self.app = gemini_food_analyzer.app
+        self._local = threading.local()
+        wait_for_model(lambda: self.app.test_client().get('/api/health').get_json())
+
+    def post(self, payload):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.post('/api/food-safety', json=payload)
+        return response.status_code, response.get_json()
+
+    def close(self):
+        pass
+
+
+class GunicornClient:
+    """Start gunicorn on the fake app and send requests over HTTP"""
+
+    def __init__(self, port, workers, threads, worker_class):
+        self.url = f"http://127.0.0.1:{port}/api/food-safety"
+        command = [sys.executable, "-m", "gunicorn", "--config", os.path.join(ROOT, "gunicorn.conf.py"),
+                   "--chdir", BENCHMARK_DIR, "--pythonpath", ROOT,
+                   "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--threads", str(threads),
+                   "--log-level", "warning"]
+        if worker_class:
+            command += ["--worker-class", worker_class]
+        self.process = subprocess.Popen(command + ["fake_app:app"], env=os.environ.copy())
+        self._wait_until_ready(f"http://127.0.0.1:{port}/api/health")
+
+    def _wait_until_ready(self, health_url):
+        def health():
+            if self.process.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            try:
+                with urllib.request.urlopen(health_url, timeout=1) as response:
+                    return json.loads(response.read())
+            except (urllib.error.URLError, OSError):
+                return None
+        wait_for_model(health)
+
+    def post(self, payload):
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode(),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+
+def wait_for_model(health, timeout=30):
+    """Poll the health payload until the (fake) Gemini model has been selected"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = health()
+        if status and status.get("gemini_model"):
+            return
+        time.sleep(0.2)
+    raise RuntimeError("Gemini model was not selected in time")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_level(client, payloads, concurrency):
+    """Send all payloads with the given number of concurrent clients"""
+    latencies = []
+    outcomes = {"errors": 0, "fallback": 0}
+    lock = threading.Lock()
+
+    def send(payload):
+        started = time.perf_counter()
+        try:
+            status, body = client.post(payload)
+        except Exception:
+            status, body = None, None
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if status != 200 or body is None:
+                outcomes["errors"] += 1
+            elif body.get("source") == "fallback":
+                outcomes["fallback"] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, payloads))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(payloads),
+        "rps": len(payloads) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "fallback_rate": outcomes["fallback"] / len(payloads),
+        "errors": outcomes["errors"]
+    }
+
+
+def main():
+    """Run the load test at each concurrency level and print one result row per level"""
+    parser = argparse.ArgumentParser(description="Load test /api/food-safety against a fake Gemini backend")
+    parser.add_argument("--target", choices=["flask", "gunicorn"], default="flask")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=400, help="requests per concurrency level")
+    parser.add_argument("--distinct-foods", type=int, default=200, help="size of the food name pool")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--worker-class", default=None, help="gunicorn worker class")
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    scratch = isolated_environment()
+    if args.target == "flask":
+        client = FlaskClient()
+    else:
+        client = GunicornClient(args.port, args.workers, args.threads, args.worker_class)
+
+    try:
+        if not args.json:
+            print(f"{'concurrency':>11} {'requests':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+                  f"{'p99 ms':>9} {'fallback':>9} {'errors':>7}")
+        for level, concurrency in enumerate(int(value) for value in args.concurrency.split(",")):
+            payloads = make_payloads(args.requests, args.distinct_foods, args.seed + level)
+            result = run_level(client, payloads, concurrency)
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"{result['concurrency']:>11} {result['requests']:>8} {result['rps']:>9.1f} "
+                      f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} "
+                      f"{result['fallback_rate']:>9.1%} {result['errors']:>7}")
+    finally:
+        client.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import random
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker with exponential backoff and jitter between probe calls
+
+    While closed, the outcome of the last window_size calls is tracked and the
+    circuit opens once at least minimum_calls were made and the failure rate
+    reaches failure_rate. While open, calls are rejected until the backoff
+    elapses; then a single probe call is let through (half-open). A successful
+    probe closes the circuit, a failed one reopens it with a doubled backoff.
+    """
+
+    def __init__(self, failure_rate=0.5, minimum_calls=5, window_size=20,
+                 backoff_seconds=5, max_backoff_seconds=300, jitter=0.2):
+        self.failure_rate = failure_rate
+        self.minimum_calls = minimum_calls
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.jitter = jitter
+        self._outcomes = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._open_until = 0.0
+        self._reopen_count = 0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self.trips = 0
+        self.rejected = 0
+
+    def available(self):
+        """Return whether a call would currently be let through, without claiming the probe slot"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return time.monotonic() >= self._open_until
+            return not self._probe_pending()
+
+    def _probe_pending(self):
+        """Return whether a probe call is still outstanding; a probe that hangs is given up on"""
+        return self._probe_in_flight and time.monotonic() - self._probe_started < self.max_backoff_seconds
+
+    def allow_request(self):
+        """Claim permission for one call, moving from open to half-open once the backoff has elapsed"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self._open_until:
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == HALF_OPEN and not self._probe_pending():
+                self._probe_in_flight = True
+                self._probe_started = time.monotonic()
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._outcomes.clear()
+                self._reopen_count = 0
+                self._probe_in_flight = False
+            self._outcomes.append(True)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._reopen_count += 1
+                self._open()
+                return
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if (self.state == CLOSED and len(self._outcomes) >= self.minimum_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open()
+
+    def _open(self):
+        """Open the circuit; callers must hold the lock"""
+        backoff = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** self._reopen_count))
+        backoff *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.state = OPEN
+        self._open_until = time.monotonic() + backoff
+        self._probe_in_flight = False
+        self._outcomes.clear()
+        self.trips += 1
+
+    def call(self, func, *args, **kwargs):
+        """Run func through the breaker, raising CircuitOpenError if the call is not allowed"""
+        if not self.allow_request():
+            raise CircuitOpenError("Circuit breaker is open")
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        """Return the breaker state, trip count and current failure rate"""
+        with self._lock:
+            failures = self._outcomes.count(False)
+            return {
+                "state": self.state,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "window_calls": len(self._outcomes),
+                "failure_rate": round(failures / len(self._outcomes), 4) if self._outcomes else 0.0,
+                "retry_in_seconds": round(max(0.0, self._open_until - time.monotonic()), 2) if self.state == OPEN else None
+            }
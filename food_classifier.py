@@ -0,0 +1,114 @@
+import csv
+import re
+
+# When a food name matches terms from several categories, the most perishable
+# category wins so the fallback analysis errs on the side of safety
+CATEGORY_PRIORITY = ["Seafood", "Meat", "Dairy", "Mixed", "Vegetables", "Grains", "Fruits", "Baked Goods"]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Trie key marking the end of a term
+TERMINAL = ""
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def plural_forms(word):
+    """Return the common English plural spellings of a word"""
+    forms = [word + "s", word + "es"]
+    if len(word) > 1 and word.endswith("y") and word[-2] not in "aeiou":
+        forms.append(word[:-1] + "ies")
+    if word.endswith("f"):
+        forms.append(word[:-1] + "ves")
+    elif word.endswith("fe"):
+        forms.append(word[:-2] + "ves")
+    return forms
+
+
+class FoodClassifier:
+    """Single-pass keyword classifier backed by a word-level trie
+
+    Lookup cost depends on the number of words in the food name, not on the
+    size of the vocabulary. Multi-word terms are matched greedily, so
+    "peanut butter" is consumed as one term before "butter" is considered.
+    """
+
+    def __init__(self, priority=CATEGORY_PRIORITY):
+        self._root = {}
+        self._rank = {category: rank for rank, category in enumerate(priority)}
+        self.size = 0
+
+    @classmethod
+    def from_file(cls, path, priority=CATEGORY_PRIORITY):
+        """Build a classifier from a CSV file with food and category columns"""
+        classifier = cls(priority)
+        with open(path, newline='', encoding='utf-8') as f:
+            terms = [(row["food"], row["category"]) for row in csv.DictReader(f)]
+        classifier.add_terms(terms)
+        return classifier
+
+    def add_terms(self, terms):
+        """Add (term, category) pairs; explicit terms take precedence over generated plurals"""
+        terms = list(terms)
+        for term, category in terms:
+            self.add(term, category)
+        for term, category in terms:
+            tokens = tokenize(term)
+            if tokens:
+                for plural in plural_forms(tokens[-1]):
+                    self._insert(tokens[:-1] + [plural], category, overwrite=False)
+
+    def add(self, term, category):
+        """Add a single term to the index"""
+        if category not in self._rank:
+            raise ValueError(f"Unknown food category: {category}")
+        tokens = tokenize(term)
+        if tokens:
+            self._insert(tokens, category, overwrite=True)
+
+    def _insert(self, tokens, category, overwrite):
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if TERMINAL not in node:
+            self.size += 1
+        elif not overwrite:
+            return
+        node[TERMINAL] = category
+
+    def matches(self, food_name):
+        """Return the (term, category) pairs found in a food name, longest match first at each position"""
+        tokens = tokenize(food_name)
+        found = []
+        position = 0
+        while position < len(tokens):
+            node = self._root
+            match_end = None
+            match_category = None
+            for end in range(position, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if TERMINAL in node:
+                    match_end = end + 1
+                    match_category = node[TERMINAL]
+            if match_end is None:
+                position += 1
+            else:
+                found.append((" ".join(tokens[position:match_end]), match_category))
+                position = match_end
+        return found
+
+    def classify(self, food_name):
+        """Return the highest-priority category matched in a food name, or None"""
+        best = None
+        for _, category in self.matches(food_name):
+            if best is None or self._rank[category] < self._rank[best]:
+                best = category
+        return best
+
+    def __len__(self):
+        return self.size
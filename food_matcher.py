@@ -0,0 +1,210 @@
+import math
+import re
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+FoodMatch = namedtuple("FoodMatch", ["key", "food_name", "score"])
+
+# Longer names are only matched exactly, keeping the trigram matrix narrow
+MAX_TRIGRAMS = 64
+
+# Letters and digits of any script, so names like 寿司 and 牛奶 keep keys of their own
+NAME_TOKEN = re.compile(r"[^\W_]+")
+
+
+def stem(word):
+    """Reduce a word to a stem shared by its singular and plural spellings
+
+    curry/curries -> curri, tomato/tomatoes -> tomato, cheese/cheeses -> chees.
+    Stems are only used as lookup keys, so they need to be consistent rather
+    than readable.
+    """
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    if len(word) > 2 and word.endswith("y"):
+        word = word[:-1] + "i"
+    return word
+
+
+def canonical_food_name(food_name):
+    """Normalize case, whitespace, punctuation, plurals and word order into a lookup key
+
+    Names without letters or digits (an emoji, say) keep their casefolded,
+    whitespace-collapsed text instead, so only a blank name maps to "".
+    """
+    folded = food_name.casefold()
+    tokens = NAME_TOKEN.findall(folded)
+    if not tokens:
+        return " ".join(folded.split())
+    return " ".join(sorted(stem(token) for token in tokens))
+
+
+def trigrams(key):
+    """Return the set of character trigrams of a key, padded so word edges count"""
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodMatcher:
+    """Approximate food name index over trigram sets
+
+    Names are compared by the Jaccard similarity of their trigram sets.
+    Lookups use prefix filtering: with every trigram set sorted by one global
+    order, two sets reaching the threshold t always share a trigram within
+    their first len - ceil(t * len) + 1 entries. Only those prefixes are
+    indexed and probed, and the order puts rare trigrams first, so posting
+    lists stay short however many names share common trigrams. Postings are
+    also split by trigram count, so names whose size alone rules them out are
+    never read. The order is a snapshot of trigram frequencies, refreshed by
+    rebuilding the index each time it doubles in size.
+
+    Candidates are scored together: every name's trigram ids are kept as a
+    row of a padded matrix, and the overlaps with the query are one gather
+    and sum over a boolean mask of the query's trigrams.
+    """
+
+    def __init__(self, threshold=0.8, max_size=100000):
+        self.threshold = threshold
+        self.max_size = max_size
+        self._keys = []
+        self._names = []
+        self._grams = []
+        self._ids = {}
+        # Trigram ids start at 1; 0 pads the rows of the trigram matrix
+        self._gram_ids = {}
+        self._gram_counts = {}
+        self._rows = np.zeros((1024, 32), dtype=np.int32)
+        self._sizes = np.zeros(1024, dtype=np.int32)
+        # (trigram frequency snapshot, postings of indexed prefixes), replaced together on rebuild
+        self._index = ({}, {})
+        self._rebuild_at = 1024
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def _prefix(self, grams, order):
+        """Return the trigrams of a set that must be indexed or probed, rarest first"""
+        ranked = sorted(grams, key=lambda gram: (order.get(gram, 0), gram))
+        return ranked[:len(ranked) - math.ceil(self.threshold * len(ranked)) + 1]
+
+    def add(self, key, food_name):
+        """Index a known food under its canonical key; the first name seen is kept"""
+        with self._lock:
+            self._add(key, food_name, index=True)
+            if len(self._keys) >= self._rebuild_at:
+                self._rebuild()
+
+    def add_many(self, entries):
+        """Index (key, food_name) pairs in bulk, building the prefix index once at the end"""
+        with self._lock:
+            for key, food_name in entries:
+                self._add(key, food_name, index=False)
+            self._rebuild()
+
+    def _add(self, key, food_name, index):
+        """Store one entry, adding it to the prefix index if index is set; callers must hold the lock"""
+        if not key or key in self._ids or len(self._keys) >= self.max_size:
+            return
+        entry_id = len(self._keys)
+        grams = trigrams(key)
+        if len(grams) > MAX_TRIGRAMS:
+            grams = set()
+        gram_ids = [self._gram_ids.setdefault(gram, len(self._gram_ids) + 1) for gram in grams]
+        for gram in grams:
+            self._gram_counts[gram] = self._gram_counts.get(gram, 0) + 1
+        self._store_row(entry_id, gram_ids)
+        self._keys.append(key)
+        self._names.append(food_name)
+        self._grams.append(grams)
+        if index:
+            # Postings are written last so a concurrent lookup never sees an entry without its row
+            order, postings = self._index
+            for gram in self._prefix(grams, order):
+                postings.setdefault(gram, {}).setdefault(len(grams), []).append(entry_id)
+        self._ids[key] = entry_id
+
+    def _store_row(self, entry_id, gram_ids):
+        """Write an entry's trigram ids, growing the matrix as needed; callers must hold the lock"""
+        rows, sizes = self._rows, self._sizes
+        if entry_id >= rows.shape[0] or len(gram_ids) > rows.shape[1]:
+            capacity = max(rows.shape[0], 2 * entry_id if entry_id >= rows.shape[0] else 0)
+            width = max(rows.shape[1], len(gram_ids))
+            rows = np.zeros((capacity, width), dtype=np.int32)
+            rows[:self._rows.shape[0], :self._rows.shape[1]] = self._rows
+            sizes = np.zeros(capacity, dtype=np.int32)
+            sizes[:self._sizes.shape[0]] = self._sizes
+        rows[entry_id, :len(gram_ids)] = gram_ids
+        sizes[entry_id] = len(gram_ids)
+        self._rows, self._sizes = rows, sizes
+
+    def _rebuild(self):
+        """Re-index every prefix under the current trigram frequencies; callers must hold the lock"""
+        order = dict(self._gram_counts)
+        postings = {}
+        for entry_id, grams in enumerate(self._grams):
+            for gram in self._prefix(grams, order):
+                postings.setdefault(gram, {}).setdefault(len(grams), []).append(entry_id)
+        self._index = (order, postings)
+        self._rebuild_at = 2 * len(self._keys)
+
+    def match(self, key):
+        """Return the FoodMatch for key or its closest known variant, or None below the threshold"""
+        entry_id = self._ids.get(key)
+        if entry_id is not None:
+            self.exact_hits += 1
+            return FoodMatch(key, self._names[entry_id], 1.0)
+        best = self._closest(key) if key and self.threshold < 1 and len(key) <= MAX_TRIGRAMS else None
+        if best is None:
+            self.misses += 1
+        else:
+            self.fuzzy_hits += 1
+        return best
+
+    def _closest(self, key):
+        grams = trigrams(key)
+        size = len(grams)
+        sizes = range(math.ceil(self.threshold * size), math.floor(size / self.threshold) + 1)
+
+        order, postings = self._index
+        candidates = set()
+        for gram in self._prefix(grams, order):
+            by_size = postings.get(gram)
+            if by_size is not None:
+                for entry_size in sizes:
+                    candidates.update(by_size.get(entry_size, ()))
+        if not candidates:
+            return None
+
+        rows, entry_sizes = self._rows, self._sizes
+        # Ids are read before the mask is sized: concurrent adds only append ids, so every id
+        # of the query and of the candidates (indexed before they were collected) fits
+        query_ids = [gram_id for gram_id in map(self._gram_ids.get, grams) if gram_id is not None]
+        query = np.zeros(len(self._gram_ids) + 1, dtype=bool)
+        query[query_ids] = True
+        query[0] = False
+        candidate_ids = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+        overlaps = query[rows[candidate_ids]].sum(axis=1)
+        scores = overlaps / (size + entry_sizes[candidate_ids] - overlaps)
+        best = int(scores.argmax())
+        if scores[best] < self.threshold:
+            return None
+        return FoodMatch(self._keys[candidate_ids[best]], self._names[candidate_ids[best]], round(float(scores[best]), 4))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def stats(self):
+        """Return index size, threshold and lookup counters"""
+        return {
+            "size": len(self._keys),
+            "max_size": self.max_size,
+            "threshold": self.threshold,
+            "exact_hits": self.exact_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses
+        }
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+"""Compiled, memory-mapped table of curated food profiles.
+
+The table is built from data/food_table.csv (guideline texts in
+data/food_guidelines.csv) and optionally from profile store exports, then
+memory-mapped read-only by every worker. Lookups hash the normalized food
+name into an open-addressing slot array, so no entry is parsed until it is
+requested and the pages are shared through the OS page cache.
+
+Usage:
+    python food_table.py build
+    python food_table.py build --profiles profiles.jsonl
+    python food_table.py lookup "grilled chicken"
+    python food_table.py stats
+"""
+import argparse
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+from food_classifier import CATEGORY_PRIORITY
+from food_matcher import canonical_food_name
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_SOURCE_PATH = os.path.join(DATA_DIR, 'food_table.csv')
+DEFAULT_GUIDELINES_PATH = os.path.join(DATA_DIR, 'food_guidelines.csv')
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'food_table.bin')
+
+MAGIC = b"FDTB"
+VERSION = 1
+
+# magic, version, entry count, slot count, then the offsets of the slots, entries, id lists and strings
+HEADER = struct.Struct("<4sHxxIIIIII")
+# name hash, key, display name and category string ids, shelf life (Room Temp, Refrigerated, Frozen),
+# danger zone hours, first id list index, ingredient count, guideline count, high risk
+ENTRY = struct.Struct("<QIIIddddIHHB3x")
+SLOT = struct.Struct("<I")
+STORAGE_TYPES = ("Room Temp", "Refrigerated", "Frozen")
+
+
+def name_hash(key):
+    """Stable 64-bit hash of a normalized name; Python's hash() differs between processes"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def hours(value):
+    """Return whole hours as int so table profiles serialize like Gemini ones"""
+    return int(value) if value == int(value) else value
+
+
+class FoodTable:
+    """Read-only view of a compiled table file"""
+
+    def __init__(self, path=DEFAULT_TABLE_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER.size:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} food table")
+        (magic, version, self._count, self._slot_count, self._slots, self._entries,
+         self._ids, self._strings) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or self._strings + 4 > len(self._map):
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} food table")
+        (self._string_count,) = SLOT.unpack_from(self._map, self._strings)
+        self._string_data = self._strings + 4 * (self._string_count + 2)
+        self.hits = 0
+        self.misses = 0
+
+    def _string(self, string_id):
+        start, end = struct.unpack_from("<II", self._map, self._strings + 4 * (string_id + 1))
+        return self._map[self._string_data + start:self._string_data + end].decode('utf-8')
+
+    def _find(self, key):
+        """Return the entry index for key, or None"""
+        target = name_hash(key)
+        mask = self._slot_count - 1
+        slot = target & mask
+        while True:
+            (entry,) = SLOT.unpack_from(self._map, self._slots + 4 * slot)
+            if entry == 0:
+                return None
+            entry_hash, key_id = struct.unpack_from("<QI", self._map, self._entries + ENTRY.size * (entry - 1))
+            if entry_hash == target and self._string(key_id) == key:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def get(self, key):
+        """Return the profile stored under a normalized food name, or None"""
+        index = self._find(key) if key else None
+        if index is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._profile(index)
+
+    def _profile(self, index):
+        (_, _, _, category_id, room_temp, refrigerated, frozen, danger_zone, first_id,
+         ingredient_count, guideline_count, high_risk) = ENTRY.unpack_from(self._map, self._entries + ENTRY.size * index)
+        ids = struct.unpack_from(f"<{ingredient_count + guideline_count}I", self._map, self._ids + 4 * first_id)
+        return {
+            "food_category": self._string(category_id),
+            "ingredients": [self._string(string_id) for string_id in ids[:ingredient_count]],
+            "high_risk": bool(high_risk),
+            "danger_zone_hours": hours(danger_zone),
+            "shelf_life": dict(zip(STORAGE_TYPES, map(hours, (room_temp, refrigerated, frozen)))),
+            "safety_guidelines": [self._string(string_id) for string_id in ids[ingredient_count:]]
+        }
+
+    def names(self):
+        """Return (key, display name) pairs for every entry"""
+        names = []
+        for index in range(self._count):
+            key_id, name_id = struct.unpack_from("<II", self._map, self._entries + ENTRY.size * index + 8)
+            names.append((self._string(key_id), self._string(name_id)))
+        return names
+
+    def __len__(self):
+        return self._count
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "size": self._count,
+            "bytes": len(self._map),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+def read_guidelines(path):
+    """Return {guideline id: text} from a CSV file with id and text columns"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row["id"]: row["text"] for row in csv.DictReader(f)}
+
+
+def read_source(path, guidelines):
+    """Yield (food_name, profile) pairs from the curated CSV, raising ValueError on invalid rows"""
+    with open(path, newline='', encoding='utf-8') as f:
+        for line_number, row in enumerate(csv.DictReader(f), 2):
+            try:
+                category = row["category"]
+                if category not in CATEGORY_PRIORITY:
+                    raise ValueError(f"unknown category {category!r}")
+                if row["high_risk"] not in ("true", "false"):
+                    raise ValueError(f"high_risk must be true or false, not {row['high_risk']!r}")
+                unknown = [guideline for guideline in row["guidelines"].split(";") if guideline not in guidelines]
+                if unknown:
+                    raise ValueError(f"unknown guideline ids {', '.join(unknown)}")
+                yield row["food"], {
+                    "food_category": category,
+                    "ingredients": [part for part in row["ingredients"].split(";") if part] or [row["food"]],
+                    "high_risk": row["high_risk"] == "true",
+                    "danger_zone_hours": float(row["danger_zone_hours"]),
+                    "shelf_life": {
+                        "Room Temp": float(row["room_temp"]),
+                        "Refrigerated": float(row["refrigerated"]),
+                        "Frozen": float(row["frozen"])
+                    },
+                    "safety_guidelines": [guidelines[guideline] for guideline in row["guidelines"].split(";")]
+                }
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"{path}:{line_number}: {e}") from None
+
+
+def read_profile_exports(path):
+    """Yield (food_name, profile) pairs from a profile store JSONL export"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                yield entry["food_name"], entry["profile"]
+
+
+def build(output_path=DEFAULT_TABLE_PATH, source_path=DEFAULT_SOURCE_PATH,
+          guidelines_path=DEFAULT_GUIDELINES_PATH, profile_exports=()):
+    """Compile the curated CSV and any profile exports into a table file, returning the entry count
+
+    Curated rows win over exported profiles for the same name. The file is
+    written under a temporary name and renamed into place, so processes
+    that already mapped the old table keep reading it unharmed.
+    """
+    entries = {}
+    for export_path in profile_exports:
+        for food_name, profile in read_profile_exports(export_path):
+            entries.setdefault(canonical_food_name(food_name), (food_name, profile))
+    for food_name, profile in read_source(source_path, read_guidelines(guidelines_path)):
+        entries[canonical_food_name(food_name)] = (food_name, profile)
+    entries.pop("", None)
+
+    strings = {}
+    def string_id(text):
+        return strings.setdefault(text, len(strings))
+
+    packed_entries = []
+    id_lists = []
+    for key, (food_name, profile) in entries.items():
+        shelf_life = profile["shelf_life"]
+        packed_entries.append(ENTRY.pack(
+            name_hash(key), string_id(key), string_id(food_name), string_id(profile["food_category"]),
+            shelf_life["Room Temp"], shelf_life["Refrigerated"], shelf_life["Frozen"],
+            profile["danger_zone_hours"], len(id_lists), len(profile["ingredients"]),
+            len(profile["safety_guidelines"]), bool(profile["high_risk"])
+        ))
+        id_lists.extend(string_id(text) for text in profile["ingredients"])
+        id_lists.extend(string_id(text) for text in profile["safety_guidelines"])
+
+    # At most half the slots are used, keeping linear probe chains short
+    slot_count = 1
+    while slot_count < 2 * len(packed_entries):
+        slot_count *= 2
+    slots = [0] * slot_count
+    for index, key in enumerate(entries):
+        slot = name_hash(key) & (slot_count - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (slot_count - 1)
+        slots[slot] = index + 1
+
+    encoded = [text.encode('utf-8') for text in strings]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    slots_offset = HEADER.size
+    entries_offset = slots_offset + 4 * slot_count
+    ids_offset = entries_offset + ENTRY.size * len(packed_entries)
+    strings_offset = ids_offset + 4 * len(id_lists)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(packed_entries), slot_count,
+                                slots_offset, entries_offset, ids_offset, strings_offset))
+            f.write(struct.pack(f"<{slot_count}I", *slots))
+            f.write(b"".join(packed_entries))
+            f.write(struct.pack(f"<{len(id_lists)}I", *id_lists))
+            f.write(struct.pack(f"<I{len(offsets)}I", len(encoded), *offsets))
+            f.write(b"".join(encoded))
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return len(packed_entries)
+
+
+def is_stale(table_path, source_paths):
+    """Return whether the table is missing or older than any of its sources"""
+    try:
+        built_at = os.path.getmtime(table_path)
+    except OSError:
+        return True
+    return any(os.path.getmtime(path) > built_at for path in source_paths if os.path.exists(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and inspect the compiled food table")
+    parser.add_argument("--path", default=os.getenv('FOOD_TABLE_PATH', DEFAULT_TABLE_PATH), help="table file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="compile the curated CSV into the table file")
+    build_parser.add_argument("--source", default=DEFAULT_SOURCE_PATH, help="curated food CSV")
+    build_parser.add_argument("--guidelines", default=DEFAULT_GUIDELINES_PATH, help="guideline id CSV")
+    build_parser.add_argument("--profiles", action="append", default=[],
+                              help="profile store JSONL export to include (repeatable)")
+    lookup_parser = commands.add_parser("lookup", help="print the profile stored for a food name")
+    lookup_parser.add_argument("food_name")
+    commands.add_parser("stats", help="show the number of entries and the file size")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        try:
+            count = build(args.path, args.source, args.guidelines, args.profiles)
+        except ValueError as e:
+            sys.exit(f"error: {e}")
+        print(f"Built {args.path} with {count} foods", file=sys.stderr)
+        return
+
+    table = FoodTable(args.path)
+    if args.command == "lookup":
+        profile = table.get(canonical_food_name(args.food_name))
+        if profile is None:
+            sys.exit(f"{args.food_name} is not in the table")
+        print(json.dumps(profile, indent=2))
+    else:
+        print(json.dumps(table.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
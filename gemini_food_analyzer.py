@@ -1,23 +1,47 @@
 import os
 import json
+import math
 import re
+import threading
+from concurrent.futures import CancelledError, TimeoutError as FutureTimeoutError
+import time
 from datetime import datetime
 import google.generativeai as genai
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, g
 from flask_cors import CORS
 from dotenv import load_dotenv
 import logging
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger('gemini_food_analyzer')
+from profile_cache import ProfileCache
+from food_classifier import FoodClassifier
+from food_matcher import FoodMatch, FoodMatcher, canonical_food_name
+from food_table import FoodTable, DEFAULT_TABLE_PATH, DEFAULT_SOURCE_PATH, DEFAULT_GUIDELINES_PATH, is_stale
+from food_table import build as build_food_table
+from profile_store import ProfileStore, DEFAULT_STORE_PATH
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from gemini_scheduler import GeminiScheduler, TokenBucket, QueueFullError, PRIORITY_NAMES, INTERACTIVE, BATCH, BACKGROUND
+from inventory import InventoryStore, DEFAULT_INVENTORY_PATH
+from metrics import Registry
+from static_assets import Asset, StaticAssets
+from refresh_ahead import RequestFrequency, RefreshAhead
+from queue_logging import QueueLogging, parse_sample_rates
+from request_profiler import RequestProfiler
 
 # Load environment variables
 load_dotenv()
 
+# Configure logging: records are formatted and written by a background thread,
+# and hot-path loggers keep only a sample of their info messages
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_SAMPLE_RATES = parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', 'gemini_food_analyzer.requests=0.1'))
+queue_logging = QueueLogging(level=LOG_LEVEL, sample_rates=LOG_SAMPLE_RATES, queue_size=LOG_QUEUE_SIZE)
+logger = logging.getLogger('gemini_food_analyzer')
+# Per-request and per-prompt messages
+request_logger = logging.getLogger('gemini_food_analyzer.requests')
+
 # Create Flask app
-app = Flask(__name__, static_folder='static')
+# Static files are served from memory by serve_static rather than Flask's built-in route
+app = Flask(__name__, static_folder=None)
 CORS(app)  # Enable CORS for all routes
 
 # Configure Gemini API
@@ -26,30 +50,245 @@ if not GEMINI_API_KEY:
     logger.error("GEMINI_API_KEY not found in environment variables")
     raise ValueError("GEMINI_API_KEY not set in environment")
 
-genai.configure(api_key=GEMINI_API_KEY)
+# Serving mode: "sync" for threaded workers, "async" for gevent workers (see gunicorn.conf.py)
+SERVING_MODE = os.getenv('SERVING_MODE', 'sync')
+
+# gRPC does not yield to gevent, so async mode talks to Gemini over REST
+GEMINI_TRANSPORT = os.getenv('GEMINI_TRANSPORT', 'rest' if SERVING_MODE == 'async' else None)
 
-# Available models to try
-AVAILABLE_MODELS = ["gemini-1.5-pro", "gemini-pro", "gemini-1.0-pro"]
+genai.configure(api_key=GEMINI_API_KEY, transport=GEMINI_TRANSPORT)
+
+# Bound on a single Gemini call, so a hung request frees its slot and counts as a breaker failure
+GEMINI_TIMEOUT_SECONDS = float(os.getenv('GEMINI_TIMEOUT_SECONDS', 30))
+GEMINI_REQUEST_OPTIONS = {"timeout": GEMINI_TIMEOUT_SECONDS}
+
+# Available models to try; every one must support system instructions and JSON response schemas,
+# which gemini-pro and gemini-1.0-pro do not
+AVAILABLE_MODELS = ["gemini-1.5-pro", "gemini-1.5-flash"]
+
+# Static instructions sent once per model; each request only carries the food names
+SYSTEM_INSTRUCTION = """You are a food safety expert. For every food you are given, return its storage safety profile:
+- food_name: the food name exactly as given
+- food_category: the closest category
+- ingredients: the main ingredients
+- high_risk: whether the food supports rapid bacterial growth
+- danger_zone_hours: hours the food can safely stay at room temperature
+- shelf_life: hours the food keeps at Room Temp, Refrigerated and Frozen
+- safety_guidelines: short, practical storage and handling guidelines
+Give all times in hours and base shelf life estimates on food safety standards.
+When given a numbered list of foods, return one profile per food in the same order."""
+
+FOOD_CATEGORIES = ["Meat", "Seafood", "Dairy", "Vegetables", "Fruits", "Grains", "Baked Goods", "Mixed"]
+
+PROFILE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "food_name": {"type": "string"},
+        "food_category": {"type": "string", "format": "enum", "enum": FOOD_CATEGORIES},
+        "ingredients": {"type": "array", "items": {"type": "string"}},
+        "high_risk": {"type": "boolean"},
+        "danger_zone_hours": {"type": "number"},
+        "shelf_life": {
+            "type": "object",
+            "properties": {
+                "Room Temp": {"type": "number"},
+                "Refrigerated": {"type": "number"},
+                "Frozen": {"type": "number"}
+            },
+            "required": ["Room Temp", "Refrigerated", "Frozen"]
+        },
+        "safety_guidelines": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["food_name", "food_category", "ingredients", "high_risk", "danger_zone_hours",
+                 "shelf_life", "safety_guidelines"]
+}
+
+# JSON response mode: single foods return one profile, batch prompts an array of profiles
+PROFILE_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": PROFILE_SCHEMA}
+BATCH_GENERATION_CONFIG = {"response_mime_type": "application/json",
+                           "response_schema": {"type": "array", "items": PROFILE_SCHEMA}}
+
+def build_model(model_name):
+    """Create a model configured with the system instruction and JSON response schema"""
+    return genai.GenerativeModel(model_name, system_instruction=SYSTEM_INSTRUCTION,
+                                 generation_config=PROFILE_GENERATION_CONFIG)
+
+# Model probe settings
+MODEL_STATE_FILE = os.getenv('GEMINI_MODEL_STATE_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.gemini_model'))
+MODEL_PROBE_LOCK_SECONDS = float(os.getenv('MODEL_PROBE_LOCK_SECONDS', 60))
+MODEL_PROBE_RETRY_SECONDS = float(os.getenv('MODEL_PROBE_RETRY_SECONDS', 300))
+# Consecutive failed Gemini calls after which the active model is dropped and the probe runs again (0 disables)
+MODEL_REVALIDATE_FAILURES = int(os.getenv('MODEL_REVALIDATE_FAILURES', 10))
+
+# The model is selected lazily; requests use the fallback analysis until it is set
+gemini_model = None
+model_probe = {
+    "state": "pending",
+    "model_name": None,
+    "source": None,
+    "started_at": None,
+    "finished_at": None,
+    "attempts": 0,
+    "consecutive_failures": 0,
+    "revalidations": 0
+}
+model_probe_lock = threading.Lock()
 
 # Find a working model
 def get_working_model():
     for model_name in AVAILABLE_MODELS:
         try:
-            logger.info(f"Trying to use model: {model_name}")
-            model = genai.GenerativeModel(model_name)
+            logger.info("Trying to use model: %s", model_name)
+            model = build_model(model_name)
             # Test the model with a simple query
-            response = model.generate_content("Hello")
+            response = model.generate_content("Hello", request_options=GEMINI_REQUEST_OPTIONS)
             if response:
-                logger.info(f"Successfully using model: {model_name}")
-                return model
+                logger.info("Successfully using model: %s", model_name)
+                return model_name, model
         except Exception as e:
-            logger.warning(f"Error with model {model_name}: {str(e)}")
+            logger.warning("Error with model %s: %s", model_name, e)
     
     logger.error("No working Gemini models found")
-    return None
+    return None, None
+
+def load_model_state():
+    """Return the model name persisted by a previous probe, if it is still a known model"""
+    try:
+        with open(MODEL_STATE_FILE) as f:
+            model_name = f.read().strip()
+    except OSError:
+        return None
+    return model_name if model_name in AVAILABLE_MODELS else None
+
+def save_model_state(model_name):
+    """Persist the chosen model name so restarts and sibling workers can skip the probe"""
+    tmp_path = f"{MODEL_STATE_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(model_name + "\n")
+        os.replace(tmp_path, MODEL_STATE_FILE)
+    except OSError as e:
+        logger.warning("Could not persist model state: %s", e)
+
+def use_model(model_name, model, source):
+    """Make a model the active one and record where it came from"""
+    global gemini_model
+    gemini_model = model
+    model_probe.update({
+        "state": "ready",
+        "model_name": model_name,
+        "source": source,
+        "finished_at": datetime.now().isoformat(),
+        "consecutive_failures": 0
+    })
+
+def discard_model_state(model_name):
+    """Remove the persisted model choice, unless a sibling worker already replaced it"""
+    if load_model_state() == model_name:
+        try:
+            os.remove(MODEL_STATE_FILE)
+        except OSError as e:
+            logger.warning("Could not remove model state: %s", e)
+
+def record_model_outcome(model, failed):
+    """Count consecutive failed calls on the active model, probing again once too many fail in a row"""
+    global gemini_model
+    if not failed:
+        if model_probe["consecutive_failures"]:
+            model_probe["consecutive_failures"] = 0
+        return
+    with model_probe_lock:
+        if model is not gemini_model or MODEL_REVALIDATE_FAILURES <= 0:
+            return
+        model_probe["consecutive_failures"] += 1
+        if model_probe["consecutive_failures"] < MODEL_REVALIDATE_FAILURES:
+            return
+        model_name = model_probe["model_name"]
+        logger.warning("Model %s failed %d calls in a row, selecting the model again",
+                       model_name, model_probe["consecutive_failures"])
+        discard_model_state(model_name)
+        gemini_model = None
+        model_probe["revalidations"] += 1
+        model_probe.update({"state": "pending", "model_name": None, "source": None, "consecutive_failures": 0})
+    start_model_probe()
+
+def acquire_probe_lock():
+    """Claim the cross-worker probe lock file, breaking it if its holder went away"""
+    lock_path = MODEL_STATE_FILE + ".lock"
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        try:
+            if time.time() - os.path.getmtime(lock_path) > MODEL_PROBE_LOCK_SECONDS:
+                os.remove(lock_path)
+                return acquire_probe_lock()
+        except OSError:
+            pass
+        return False
+    except OSError:
+        # Read-only or missing directory: probe without coordinating
+        return True
+
+def release_probe_lock():
+    try:
+        os.remove(MODEL_STATE_FILE + ".lock")
+    except OSError:
+        pass
+
+def run_model_probe():
+    """Select a working model in the background, waiting on a sibling worker's probe if one is running"""
+    deadline = time.time() + MODEL_PROBE_LOCK_SECONDS
+    locked = acquire_probe_lock()
+    while not locked:
+        # Another worker is probing; pick up its result when it lands
+        model_name = load_model_state()
+        if model_name:
+            use_model(model_name, build_model(model_name), "state_file")
+            return
+        if time.time() > deadline:
+            break
+        time.sleep(0.5)
+        locked = acquire_probe_lock()
+    
+    try:
+        model_name, model = get_working_model()
+        if model is not None:
+            save_model_state(model_name)
+            use_model(model_name, model, "probe")
+        else:
+            model_probe.update({"state": "failed", "finished_at": datetime.now().isoformat()})
+    finally:
+        if locked:
+            release_probe_lock()
+
+def start_model_probe():
+    """Pick the Gemini model without blocking: reuse the persisted choice or probe in a background thread"""
+    with model_probe_lock:
+        if model_probe["state"] in ("probing", "ready"):
+            return
+        model_probe["attempts"] += 1
+        model_probe["started_at"] = datetime.now().isoformat()
+        
+        model_name = load_model_state()
+        if model_name:
+            logger.info("Using persisted model choice: %s", model_name)
+            use_model(model_name, build_model(model_name), "state_file")
+            return
+        
+        model_probe["state"] = "probing"
+        threading.Thread(target=run_model_probe, name="gemini-model-probe", daemon=True).start()
+
+def get_gemini_model():
+    """Return the active model, retrying a failed probe once the retry interval has passed"""
+    if gemini_model is None and model_probe["state"] == "failed":
+        finished_at = datetime.fromisoformat(model_probe["finished_at"])
+        if (datetime.now() - finished_at).total_seconds() > MODEL_PROBE_RETRY_SECONDS:
+            start_model_probe()
+    return gemini_model
 
-# Get the model
-gemini_model = get_working_model()
+# Select the model in the background so workers start serving immediately
+start_model_probe()
 
 # Storage type definitions
 STORAGE_TYPES = {
@@ -102,6 +341,15 @@ DEFAULT_EXPIRY = {
     }
 }
 
+# Messages for each safety status, formatted with the lowercase food category
+SAFETY_MESSAGES = {
+    "expired": "This {category} item has expired and should be discarded.",
+    "unsafe": "This {category} has been in the danger zone for too long and may be unsafe.",
+    "consume_immediately": "This {category} should be consumed immediately.",
+    "consume_soon": "This {category} should be consumed soon.",
+    "safe_today": "This {category} is safe to consume."
+}
+
 # Danger zone temperatures for food safety
 DANGER_ZONE = {
     "min": 40,  # 40°F (4°C)
@@ -120,145 +368,769 @@ DANGER_ZONE_HOURS = {
     "Mixed": 2
 }
 
-def analyze_food_with_gemini(food_name, storage_type, hours_since_prepared):
+# Profile cache settings
+PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 1024))
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv('PROFILE_CACHE_TTL_SECONDS', 86400))
+
+# Hour-independent food profiles keyed by normalized food name
+profile_cache = ProfileCache(max_size=PROFILE_CACHE_SIZE, ttl_seconds=PROFILE_CACHE_TTL_SECONDS)
+
+# Metrics exposed on /api/metrics; hot paths keep references to the labelled children
+metrics = Registry()
+STAGE_SECONDS = metrics.histogram(
+    "food_safety_stage_seconds", "Time spent in each stage of a food safety analysis", "stage",
+    ["parse", "prompt", "upstream_wait", "gemini_call", "json_extract", "backfill", "fallback"])
+STAGE_PARSE = STAGE_SECONDS.labels("parse")
+STAGE_PROMPT = STAGE_SECONDS.labels("prompt")
+STAGE_UPSTREAM_WAIT = STAGE_SECONDS.labels("upstream_wait")
+STAGE_GEMINI_CALL = STAGE_SECONDS.labels("gemini_call")
+STAGE_JSON_EXTRACT = STAGE_SECONDS.labels("json_extract")
+STAGE_BACKFILL = STAGE_SECONDS.labels("backfill")
+STAGE_FALLBACK = STAGE_SECONDS.labels("fallback")
+FALLBACK_REASONS = metrics.counter(
+    "food_safety_fallback_total", "Gemini lookups that fell back to the keyword analysis, by reason", "reason",
+    ["no_model", "empty_response", "no_json", "decode_error", "exception", "circuit_open", "deadline", "queue_full"])
+FALLBACK_NO_MODEL = FALLBACK_REASONS.labels("no_model")
+FALLBACK_EMPTY_RESPONSE = FALLBACK_REASONS.labels("empty_response")
+FALLBACK_NO_JSON = FALLBACK_REASONS.labels("no_json")
+FALLBACK_DECODE_ERROR = FALLBACK_REASONS.labels("decode_error")
+FALLBACK_EXCEPTION = FALLBACK_REASONS.labels("exception")
+FALLBACK_CIRCUIT_OPEN = FALLBACK_REASONS.labels("circuit_open")
+FALLBACK_DEADLINE = FALLBACK_REASONS.labels("deadline")
+FALLBACK_QUEUE_FULL = FALLBACK_REASONS.labels("queue_full")
+SCHEDULER_WAIT_SECONDS = metrics.histogram(
+    "gemini_scheduler_wait_seconds", "Time foods spent queued for a Gemini prompt, by priority", "priority",
+    PRIORITY_NAMES)
+SCHEDULER_WAIT_BY_PRIORITY = {priority: SCHEDULER_WAIT_SECONDS.labels(priority) for priority in PRIORITY_NAMES}
+REQUESTS_BY_STORAGE = metrics.counter(
+    "food_safety_requests_total", "Analyzed food items by storage type", "storage_type", list(STORAGE_TYPES.keys()))
+metrics.callback_gauge(
+    "gemini_model_info", "Gemini model currently in use", "model",
+    lambda: {model_probe["model_name"]: 1} if gemini_model is not None else {})
+metrics.callback_counter(
+    "profile_cache_lookups_total", "In-memory profile cache lookups by result", "result",
+    lambda: {"hit": profile_cache.hits, "miss": profile_cache.misses})
+metrics.callback_counter(
+    "food_table_lookups_total", "Compiled food table lookups by result", "result",
+    lambda: {"hit": food_table.hits, "miss": food_table.misses} if food_table is not None else {})
+metrics.callback_counter(
+    "food_match_lookups_total", "Food name index lookups by result", "result",
+    lambda: {"exact": food_matcher.exact_hits, "fuzzy": food_matcher.fuzzy_hits, "miss": food_matcher.misses})
+metrics.callback_counter(
+    "gemini_requests_coalesced_total", "Gemini requests that shared a queued or running request for the same food", None,
+    lambda: {None: gemini_scheduler.merged})
+metrics.callback_gauge(
+    "gemini_circuit_breaker_open", "Whether the Gemini circuit breaker is rejecting calls", None,
+    lambda: {None: 0 if gemini_breaker.state == "closed" else 1})
+metrics.callback_gauge(
+    "gemini_upstream_calls", "Gemini calls in flight or waiting for an upstream slot", "state",
+    lambda: dict(upstream_calls))
+metrics.callback_gauge(
+    "gemini_scheduler_queue_depth", "Foods queued for a Gemini prompt, by priority", "priority",
+    lambda: gemini_scheduler.depth())
+metrics.callback_gauge(
+    "gemini_quota_used", "Gemini prompts sent in the last minute", None,
+    lambda: {None: gemini_scheduler.quota_used()})
+metrics.callback_gauge(
+    "gemini_quota_tokens_available", "Gemini prompts that can be sent now without waiting for quota", None,
+    lambda: {None: gemini_scheduler.bucket.available()})
+metrics.callback_counter(
+    "profile_refresh_ahead_total", "Hot foods visited by the refresh-ahead worker, by outcome", "outcome",
+    lambda: dict(refresh_ahead.outcomes))
+metrics.callback_counter(
+    "log_records_discarded_total", "Log records not written, dropped on a full queue or sampled out", "reason",
+    lambda: {"queue_full": queue_logging.handler.dropped,
+             "sampled_out": sum(sampling.sampled_out for sampling in queue_logging.filters.values())})
+
+# Latency budget for a request; when Gemini is slower the fallback answer is returned.
+# A prompt already sent finishes in the background to fill the cache
+REQUEST_DEADLINE_SECONDS = float(os.getenv('REQUEST_DEADLINE_MS', 800)) / 1000
+
+# Upper bound on concurrent Gemini calls in this process; async workers can hold far more
+UPSTREAM_CONCURRENCY = int(os.getenv('UPSTREAM_CONCURRENCY', 100 if SERVING_MODE == 'async' else 8))
+upstream_slots = threading.BoundedSemaphore(UPSTREAM_CONCURRENCY)
+upstream_calls = {"in_flight": 0, "waiting": 0}
+upstream_calls_lock = threading.Lock()
+
+# Circuit breaker around Gemini calls so an unhealthy API is skipped instead of awaited
+gemini_breaker = CircuitBreaker(
+    failure_rate=float(os.getenv('BREAKER_FAILURE_RATE', 0.5)),
+    minimum_calls=int(os.getenv('BREAKER_MIN_CALLS', 5)),
+    window_size=int(os.getenv('BREAKER_WINDOW', 20)),
+    backoff_seconds=float(os.getenv('BREAKER_BACKOFF_SECONDS', 5)),
+    max_backoff_seconds=float(os.getenv('BREAKER_MAX_BACKOFF_SECONDS', 300))
+)
+
+# Shared profile store settings
+PROFILE_STORE_PATH = os.getenv('PROFILE_STORE_PATH', DEFAULT_STORE_PATH)
+PROFILE_STORE_TTL_SECONDS = float(os.getenv('PROFILE_STORE_TTL_SECONDS', 30 * 86400))
+PROFILE_STORE_PRELOAD = int(os.getenv('PROFILE_STORE_PRELOAD', 256))
+
+# Validated profiles persisted across restarts and shared by all workers
+profile_store = ProfileStore(PROFILE_STORE_PATH, ttl_seconds=PROFILE_STORE_TTL_SECONDS)
+
+def preload_profile_cache():
+    """Warm the in-memory cache with the most requested stored profiles"""
+    preloaded = profile_store.hottest(min(PROFILE_STORE_PRELOAD, PROFILE_CACHE_SIZE))
+    for cache_key, profile in preloaded:
+        profile_cache.put(cache_key, profile)
+    logger.info("Preloaded %d profiles from the profile store", len(preloaded))
+
+preload_profile_cache()
+
+# Curated profiles compiled into a memory-mapped file; every worker maps the same pages
+FOOD_TABLE_PATH = os.getenv('FOOD_TABLE_PATH', DEFAULT_TABLE_PATH)
+
+def open_food_table():
+    """Map the compiled food table, building it first if it is missing or older than the curated data"""
+    try:
+        if is_stale(FOOD_TABLE_PATH, [DEFAULT_SOURCE_PATH, DEFAULT_GUIDELINES_PATH]):
+            count = build_food_table(FOOD_TABLE_PATH)
+            logger.info("Built the food table with %d foods at %s", count, FOOD_TABLE_PATH)
+        return FoodTable(FOOD_TABLE_PATH)
+    except (OSError, ValueError) as e:
+        logger.warning("Food table unavailable, continuing without it: %s", e)
+        return None
+
+food_table = open_food_table()
+
+# Approximate name index so close variants of a known food reuse its profile
+FOOD_MATCH_THRESHOLD = float(os.getenv('FOOD_MATCH_THRESHOLD', 0.8))
+FOOD_MATCH_INDEX_SIZE = int(os.getenv('FOOD_MATCH_INDEX_SIZE', 100000))
+food_matcher = FoodMatcher(threshold=FOOD_MATCH_THRESHOLD, max_size=FOOD_MATCH_INDEX_SIZE)
+
+def preload_food_matcher():
+    """Index the names of the food table and of stored profiles, most requested first"""
+    names = (food_table.names() if food_table is not None else []) + profile_store.names(FOOD_MATCH_INDEX_SIZE)
+    food_matcher.add_many(names)
+    logger.info("Indexed %d table and stored food names for fuzzy matching", len(names))
+
+# Indexing a large store takes a few seconds, so it runs in the background; until it
+# finishes, variants of stored foods are still found through the exact store lookup
+threading.Thread(target=preload_food_matcher, name="food-matcher-preload", daemon=True).start()
+
+HIGH_RISK_CATEGORIES = ["Meat", "Seafood", "Dairy", "Mixed"]
+
+# Lookups used to validate Gemini responses
+CATEGORY_NAMES = {category.lower(): category for category in FOOD_CATEGORIES}
+LEADING_NUMBER = re.compile(r'\s*(\d+(?:\.\d+)?)')
+JSON_DECODER = json.JSONDecoder()
+
+# Keyword index used to categorize foods without calling Gemini
+FOOD_VOCABULARY_FILE = os.getenv('FOOD_VOCABULARY_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'food_vocabulary.csv'))
+food_classifier = FoodClassifier.from_file(FOOD_VOCABULARY_FILE)
+
+# Batch analysis settings
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 500))
+BATCH_PROMPT_SIZE = int(os.getenv('BATCH_PROMPT_SIZE', 25))
+
+# Gemini quota for this process; every prompt, single or batched, takes one token
+GEMINI_QUOTA_RPM = float(os.getenv('GEMINI_QUOTA_RPM', 60))
+GEMINI_QUOTA_BURST = int(os.getenv('GEMINI_QUOTA_BURST', 10))
+SCHEDULER_BATCH_WINDOW_SECONDS = float(os.getenv('SCHEDULER_BATCH_WINDOW_MS', 25)) / 1000
+SCHEDULER_INTERACTIVE_BATCH_SIZE = int(os.getenv('SCHEDULER_INTERACTIVE_BATCH_SIZE', 5))
+SCHEDULER_MAX_QUEUE = int(os.getenv('SCHEDULER_MAX_QUEUE', 1000))
+
+# All Gemini profile requests go through one queue, so bursts are spread over the quota
+# by priority and foods queued together share a prompt
+gemini_scheduler = GeminiScheduler(
+    lambda food_names: fetch_scheduled_profiles(food_names),
+    TokenBucket(GEMINI_QUOTA_RPM / 60, GEMINI_QUOTA_BURST),
+    key_func=lambda food_name: normalize_food_name(food_name),
+    batch_window=SCHEDULER_BATCH_WINDOW_SECONDS,
+    batch_sizes=(SCHEDULER_INTERACTIVE_BATCH_SIZE, BATCH_PROMPT_SIZE, BATCH_PROMPT_SIZE),
+    max_queue=SCHEDULER_MAX_QUEUE,
+    workers=UPSTREAM_CONCURRENCY,
+    observe_wait=lambda priority, seconds: SCHEDULER_WAIT_BY_PRIORITY[priority].observe(seconds),
+    ready=lambda: gemini_breaker.available()
+)
+
+# Refresh-ahead: the REFRESH_HOT_SET_SIZE most requested foods are re-analyzed in the background
+# once less than REFRESH_AHEAD_FRACTION of their lifetime is left, so they never miss on the
+# request path. Gemini refreshes are only sent when idle and capped at REFRESH_BUDGET_PER_MINUTE
+# across all workers: each one is leased in the shared profile store for REFRESH_LEASE_SECONDS,
+# so sibling workers with the same hot set neither repeat it nor exceed the budget
+REFRESH_HOT_SET_SIZE = int(os.getenv('REFRESH_HOT_SET_SIZE', 100))
+REFRESH_BUDGET_PER_MINUTE = int(os.getenv('REFRESH_BUDGET_PER_MINUTE', 6))
+REFRESH_AHEAD_FRACTION = float(os.getenv('REFRESH_AHEAD_FRACTION', 0.2))
+REFRESH_INTERVAL_SECONDS = float(os.getenv('REFRESH_INTERVAL_SECONDS', 30))
+REFRESH_HALF_LIFE_SECONDS = float(os.getenv('REFRESH_HALF_LIFE_SECONDS', 3600))
+REFRESH_LEASE_SECONDS = float(os.getenv('REFRESH_LEASE_SECONDS', 300))
+request_frequency = RequestFrequency(half_life=REFRESH_HALF_LIFE_SECONDS,
+                                     max_tracked=max(1000, 20 * REFRESH_HOT_SET_SIZE))
+refreshing = set()
+refresh_ahead = RefreshAhead(request_frequency, lambda cache_key, food_name: refresh_hot_profile(cache_key, food_name),
+                             hot_set_size=REFRESH_HOT_SET_SIZE, interval=REFRESH_INTERVAL_SECONDS)
+refresh_ahead.start()
+
+# Tracked food items with expiry-ordered indexes, shared by all workers
+INVENTORY_DB_PATH = os.getenv('INVENTORY_DB_PATH', DEFAULT_INVENTORY_PATH)
+INVENTORY_QUERY_LIMIT = int(os.getenv('INVENTORY_QUERY_LIMIT', 500))
+inventory = InventoryStore(INVENTORY_DB_PATH)
+INVENTORY_TIMESTAMPS = ["prepared_at", "storage_since", "expires_at", "unsafe_at", "unsafe_since"]
+# Accepted preparation times; the upper bound leaves room for every status change to render as a date
+MIN_PREPARED_AT = 0.0
+MAX_PREPARED_AT = datetime(3000, 1, 1).timestamp()
+
+# Static files and unchanging API payloads are encoded and compressed once per process.
+# Pages and payloads at fixed URLs are revalidated on every load, which their ETags make cheap
+STATIC_MAX_AGE_SECONDS = int(os.getenv('STATIC_MAX_AGE_SECONDS', 86400))
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+static_assets = StaticAssets(os.path.join(app.root_path, 'static'),
+                             cache_control=f"public, max-age={STATIC_MAX_AGE_SECONDS}",
+                             html_cache_control=REVALIDATE_CACHE_CONTROL)
+
+def json_asset(payload):
+    """Serialize an unchanging JSON payload once, exactly as jsonify would"""
+    return Asset(app.json.response(payload).get_data(), "application/json", REVALIDATE_CACHE_CONTROL)
+
+storage_types_asset = json_asset(list(STORAGE_TYPES.keys()))
+
+# Opt-in request profiling: requests carrying PROFILE_HEADER with PROFILE_TOKEN, and a
+# PROFILE_SAMPLE_RATE share of all requests, are profiled into PROFILE_DIR
+PROFILE_HEADER = os.getenv('PROFILE_HEADER', 'X-Profile-Token')
+request_profiler = RequestProfiler(
+    os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')),
+    sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+    header_token=os.getenv('PROFILE_TOKEN') or None,
+    mode=os.getenv('PROFILE_MODE', 'cprofile'),
+    interval=float(os.getenv('PROFILE_INTERVAL_MS', 5)) / 1000,
+    min_duration=float(os.getenv('PROFILE_MIN_MS', 0)) / 1000,
+    max_files=int(os.getenv('PROFILE_MAX_FILES', 200))
+)
+
+@app.before_request
+def start_request_profile():
+    if request_profiler.enabled:
+        session = request_profiler.start(request.headers.get(PROFILE_HEADER))
+        if session is not None:
+            g.request_profile = session
+
+@app.after_request
+def finish_request_profile(response):
+    session = g.pop('request_profile', None)
+    if session is not None:
+        try:
+            name = request_profiler.finish(session, request.method, request.path, response.status_code)
+        except OSError as e:
+            logger.warning("Could not write request profile: %s", e)
+        else:
+            if name is not None:
+                response.headers['X-Profile-File'] = name
+    return response
+
+def normalize_food_name(food_name):
+    """Normalize a food name for use as a cache key, ignoring case, whitespace, plurals and word order"""
+    return canonical_food_name(food_name)
+
+def analyze_food_with_gemini(food_name, storage_type, hours_since_prepared, priority=INTERACTIVE):
     """Analyze food safety using Gemini API"""
-    if not gemini_model:
-        logger.error("No working Gemini model available")
+    profile, source, match = resolve_food_profile(food_name, priority)
+    if profile is None:
         return fallback_food_analysis(food_name, storage_type, hours_since_prepared)
     
+    return evaluate_food_safety(food_name, profile, storage_type, hours_since_prepared, source, match)
+
+def resolve_food_profile(food_name, priority=INTERACTIVE):
+    """Find a food profile within the request deadline, returning (profile, source, match) or (None, None, None)"""
+    cache_key = normalize_food_name(food_name)
+    if not cache_key:
+        # A blank name has no key of its own and must never share one
+        return None, None, None
+    match = food_matcher.match(cache_key)
+    if match is not None:
+        profile, source = lookup_known_profile(match.key)
+        if profile is None:
+            # The matched food's profile expired; look this food up on its own
+            match = None
+    if match is None:
+        profile = profile_cache.get(cache_key)
+        source = "cache"
+        if profile is None:
+            profile = lookup_table_profile(cache_key)
+            source = "table"
+    
+    if profile is None and not gemini_breaker.available():
+        # Gemini is failing; answer from the shared store or the fallback without waiting
+        profile = profile_store.get(cache_key)
+        if profile is None:
+            FALLBACK_CIRCUIT_OPEN.inc()
+            return None, None, None
+        profile_cache.put(cache_key, profile)
+        source = "store"
+    
+    if profile is None:
+        profile, source = load_food_profile(food_name, cache_key, priority)
+        if profile is None:
+            return None, None, None
+    
+    if match is None:
+        # The profile is this food's own
+        match = FoodMatch(cache_key, food_name, 1.0)
+    if priority == INTERACTIVE and source != "table":
+        request_frequency.record(match.key, match.food_name)
+    return profile, source, match
+
+def lookup_known_profile(cache_key):
+    """Return (profile, source) from the in-memory cache, the food table or the shared store, or (None, None)"""
+    profile = profile_cache.get(cache_key)
+    if profile is not None:
+        return profile, "cache"
+    profile = lookup_table_profile(cache_key)
+    if profile is not None:
+        return profile, "table"
+    profile = profile_store.get(cache_key)
+    if profile is not None:
+        profile_cache.put(cache_key, profile)
+        return profile, "store"
+    return None, None
+
+def lookup_table_profile(cache_key):
+    """Return the curated profile for a normalized food name, or None"""
+    return food_table.get(cache_key) if food_table is not None else None
+
+def load_food_profile(food_name, cache_key, priority=INTERACTIVE):
+    """Load a profile from the shared store or Gemini within the request deadline, returning (profile, source)
+
+    Concurrent requests for the same food share one scheduler entry. A prompt
+    already sent when the deadline passes still fills the cache; a food still
+    queued is withdrawn once nobody waits for it, so it costs no quota.
+    """
+    profile = profile_store.get(cache_key)
+    if profile is not None:
+        profile_cache.put(cache_key, profile)
+        food_matcher.add(cache_key, food_name)
+        return profile, "store"
+    
+    try:
+        future = gemini_scheduler.submit(food_name, priority)
+    except QueueFullError:
+        FALLBACK_QUEUE_FULL.inc()
+        logger.warning("Gemini scheduler queue is full, skipping Gemini for %s", food_name)
+        return None, None
+    try:
+        return future.result(timeout=REQUEST_DEADLINE_SECONDS), "gemini"
+    except (QueueFullError, CancelledError):
+        # Evicted by more urgent work, or dropped once nobody waited for it
+        FALLBACK_QUEUE_FULL.inc()
+        return None, None
+    except FutureTimeoutError:
+        gemini_scheduler.withdraw(future)
+        FALLBACK_DEADLINE.inc()
+        logger.warning("Gemini missed the %ss deadline for %s, answering with fallback", REQUEST_DEADLINE_SECONDS, food_name)
+        return None, None
+
+def remember_profile(cache_key, food_name, profile):
+    """Store a validated Gemini profile in the in-memory cache and the shared store"""
+    if not cache_key:
+        return
+    profile_cache.put(cache_key, profile)
+    profile_store.put(cache_key, food_name, profile)
+    food_matcher.add(cache_key, food_name)
+
+def refresh_hot_profile(cache_key, food_name):
+    """Keep a popular food's profile ahead of expiry, returning what was done for refresh_ahead's stats"""
+    if lookup_table_profile(cache_key) is not None:
+        # Curated profiles never expire
+        return "table"
+    if cache_key in refreshing:
+        return "pending"
+    
+    outcome = "fresh"
+    updated_at = profile_store.updated_at(cache_key)
+    store_left = None if updated_at is None else updated_at + profile_store.ttl_seconds - time.time()
+    if store_left is None or store_left < REFRESH_AHEAD_FRACTION * profile_store.ttl_seconds:
+        claim = profile_store.claim_refresh(cache_key, REFRESH_LEASE_SECONDS, REFRESH_BUDGET_PER_MINUTE) \
+            if refresh_load_is_low() else "busy"
+        if claim == "leased":
+            # A sibling worker is refreshing it
+            outcome = "pending"
+        elif claim != "claimed":
+            outcome = "deferred"
+        else:
+            # fetch_scheduled_profiles replaces the cache and store entries when the answer arrives
+            try:
+                future = gemini_scheduler.submit(food_name, BACKGROUND)
+            except QueueFullError:
+                profile_store.release_refresh(cache_key)
+                outcome = "deferred"
+            else:
+                refreshing.add(cache_key)
+                future.add_done_callback(lambda _: refreshing.discard(cache_key))
+                return "refreshing"
+    
+    # Until Gemini answers, the stored copy keeps the cache warm
+    cache_left = profile_cache.expires_in(cache_key)
+    if cache_left is None or cache_left < REFRESH_AHEAD_FRACTION * profile_cache.ttl_seconds:
+        profile = profile_store.get(cache_key, count_hit=False)
+        if profile is not None:
+            profile_cache.put(cache_key, profile)
+            return "reloaded"
+    return outcome
+
+def refresh_load_is_low():
+    """Whether Gemini has room for refreshes: nothing urgent queued, half the quota burst spare and a healthy API"""
+    depth = gemini_scheduler.depth()
+    return (depth["interactive"] == 0 and depth["batch"] == 0 and gemini_breaker.state == "closed"
+            and upstream_calls["in_flight"] < UPSTREAM_CONCURRENCY / 2
+            and gemini_scheduler.bucket.available() >= GEMINI_QUOTA_BURST / 2)
+
+def fetch_scheduled_profiles(food_names):
+    """Fetch and remember the profiles of foods the scheduler dispatched together, keyed by normalized name"""
+    if len(food_names) == 1:
+        profile = fetch_gemini_profile(food_names[0])
+        profiles = {} if profile is None else {normalize_food_name(food_names[0]): profile}
+    else:
+        profiles = fetch_gemini_profiles(food_names)
+    requested = {normalize_food_name(food_name): food_name for food_name in food_names}
+    for cache_key, profile in profiles.items():
+        remember_profile(cache_key, requested[cache_key], profile)
+    return profiles
+
+def fetch_gemini_profile(food_name):
+    """Ask Gemini for the hour-independent safety profile of a food, or None on failure"""
+    model = get_gemini_model()
+    if not model:
+        FALLBACK_NO_MODEL.inc()
+        logger.error("No working Gemini model available")
+        return None
+    
     try:
-        prompt = f"""
-        You are a food safety expert. Analyze the safety of the following food item:
-        
-        Food: {food_name}
-        Current storage: {STORAGE_TYPES.get(storage_type, storage_type)}
-        Hours since prepared/cooked: {hours_since_prepared}
-        
-        Respond with a JSON object only (no other text) in this exact format:
-        {{
-            "food_name": "{food_name}",
-            "food_category": "One of: Meat, Seafood, Dairy, Vegetables, Fruits, Grains, Baked Goods, Mixed",
-            "ingredients": ["ingredient1", "ingredient2", ...],
-            "high_risk": true/false,
-            "safety_status": "One of: fresh, safe_today, consume_soon, consume_immediately, change_storage, unsafe, expired",
-            "safety_message": "Clear message about the food safety status",
-            "danger_zone_hours": number of hours this food can safely be at room temperature,
-            "shelf_life": {{
-                "Room Temp": hours at room temperature,
-                "Refrigerated": hours when refrigerated,
-                "Frozen": hours when frozen
-            }},
-            "recommended_storage": "Most appropriate storage type",
-            "safety_guidelines": [
-                "Guideline 1",
-                "Guideline 2",
-                ...
-            ]
-        }}
-        
-        Ensure all times are in hours, all values are in the specified format, and provide accurate shelf life estimates based on food safety standards.
-        """
-
-        logger.info(f"Sending prompt to Gemini for food: {food_name}")
-        response = gemini_model.generate_content(prompt)
+        started = time.perf_counter()
+        prompt = f"Food: {food_name}"
+        STAGE_PROMPT.observe(time.perf_counter() - started)
+
+        request_logger.info("Sending prompt to Gemini for food: %s", food_name)
+        response = gemini_breaker.call(timed_generate_content, model, prompt)
         
         if not response or not response.text:
+            FALLBACK_EMPTY_RESPONSE.inc()
             logger.warning("Empty response from Gemini")
-            return fallback_food_analysis(food_name, storage_type, hours_since_prepared)
-            
-        # Try to extract valid JSON
+            return None
+        
+        started = time.perf_counter()
+        try:
+            analysis = parse_json_response(response.text, "{")
+        finally:
+            STAGE_JSON_EXTRACT.observe(time.perf_counter() - started)
+        
+        if analysis is None:
+            FALLBACK_NO_JSON.inc()
+            logger.warning("No JSON found in Gemini response")
+            return None
+        
+        request_logger.info("Successfully analyzed %s with Gemini", food_name)
+        started = time.perf_counter()
+        profile = validate_food_profile(food_name, analysis)
+        STAGE_BACKFILL.observe(time.perf_counter() - started)
+        return profile
+    
+    except json.JSONDecodeError as e:
+        FALLBACK_DECODE_ERROR.inc()
+        logger.error("JSON decode error: %s", e)
+        return None
+    except CircuitOpenError:
+        FALLBACK_CIRCUIT_OPEN.inc()
+        request_logger.info("Circuit breaker open, skipping Gemini for %s", food_name)
+        return None
+    except Exception as e:
+        FALLBACK_EXCEPTION.inc()
+        logger.error("Error in Gemini analysis: %s", e)
+        return None
+
+def timed_generate_content(model, prompt, generation_config=None):
+    """Call the model within the upstream concurrency limit, recording the wait and the API latency"""
+    started = time.perf_counter()
+    with upstream_calls_lock:
+        upstream_calls["waiting"] += 1
+    with upstream_slots:
+        with upstream_calls_lock:
+            upstream_calls["waiting"] -= 1
+            upstream_calls["in_flight"] += 1
+        STAGE_UPSTREAM_WAIT.observe(time.perf_counter() - started)
+        started = time.perf_counter()
         try:
-            # Find JSON in the response
-            json_pattern = r'({[\s\S]*})'
-            json_match = re.search(json_pattern, response.text)
-            
-            if json_match:
-                json_text = json_match.group(1)
-                analysis = json.loads(json_text)
-                logger.info(f"Successfully analyzed {food_name} with Gemini")
-                
-                # Validate response format
-                required_fields = ["food_name", "food_category", "ingredients", "high_risk", 
-                                   "safety_status", "safety_message", "danger_zone_hours", 
-                                   "shelf_life", "recommended_storage", "safety_guidelines"]
-                
-                for field in required_fields:
-                    if field not in analysis:
-                        logger.warning(f"Missing field in Gemini response: {field}")
-                        analysis[field] = None
-                
-                # Ensure all storage types are present
-                if "shelf_life" in analysis:
-                    for storage in STORAGE_TYPES.keys():
-                        if storage not in analysis["shelf_life"]:
-                            if analysis["food_category"] in DEFAULT_EXPIRY:
-                                analysis["shelf_life"][storage] = DEFAULT_EXPIRY[analysis["food_category"]][storage]
-                            else:
-                                analysis["shelf_life"][storage] = DEFAULT_EXPIRY["Mixed"][storage]
-                
-                return analysis
+            if generation_config is None:
+                response = model.generate_content(prompt, request_options=GEMINI_REQUEST_OPTIONS)
             else:
-                logger.warning("No JSON found in Gemini response")
-                return fallback_food_analysis(food_name, storage_type, hours_since_prepared)
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
-            return fallback_food_analysis(food_name, storage_type, hours_since_prepared)
-            
+                response = model.generate_content(prompt, generation_config=generation_config,
+                                                  request_options=GEMINI_REQUEST_OPTIONS)
+        except Exception:
+            record_model_outcome(model, failed=True)
+            raise
+        else:
+            record_model_outcome(model, failed=False)
+            return response
+        finally:
+            STAGE_GEMINI_CALL.observe(time.perf_counter() - started)
+            with upstream_calls_lock:
+                upstream_calls["in_flight"] -= 1
+
+def parse_json_response(text, opening):
+    """Decode the JSON value that starts at the first opening bracket, without scanning past its end"""
+    start = text.find(opening)
+    if start < 0:
+        return None
+    value, _ = JSON_DECODER.raw_decode(text, start)
+    return value
+
+def analyze_foods_batch(items):
+    """Analyze a list of (food_name, storage_type, hours_since_prepared) items with batched Gemini prompts"""
+    # Collect the distinct foods that still need a Gemini profile
+    profiles = {}
+    sources = {}
+    matches = {}
+    missing = {}
+    for food_name, _, _ in items:
+        cache_key = normalize_food_name(food_name)
+        if not cache_key or cache_key in profiles or cache_key in missing:
+            continue
+        match = food_matcher.match(cache_key)
+        profile, source = lookup_known_profile(match.key if match else cache_key)
+        if profile is None and match is not None and match.key != cache_key:
+            # The matched food's profile expired; look this food up on its own
+            match = None
+            profile, source = lookup_known_profile(cache_key)
+        if profile is None:
+            missing[cache_key] = food_name
+        else:
+            profiles[cache_key] = profile
+            sources[cache_key] = source
+            matches[cache_key] = match or FoodMatch(cache_key, food_name, 1.0)
+    
+    # Queue the missing foods together; the scheduler packs them into shared prompts
+    futures = {}
+    for cache_key, food_name in missing.items():
+        try:
+            futures[cache_key] = gemini_scheduler.submit(food_name, BATCH)
+        except QueueFullError:
+            FALLBACK_QUEUE_FULL.inc()
+            logger.warning("Gemini scheduler queue is full, %d foods will use the fallback", len(missing) - len(futures))
+            break
+    # The batch shares one latency budget; foods still queued when it runs out are withdrawn
+    deadline = time.monotonic() + REQUEST_DEADLINE_SECONDS
+    for cache_key, future in futures.items():
+        try:
+            profile = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except (QueueFullError, CancelledError):
+            # Evicted by more urgent work, or dropped once nobody waited for it
+            FALLBACK_QUEUE_FULL.inc()
+            continue
+        except FutureTimeoutError:
+            gemini_scheduler.withdraw(future)
+            FALLBACK_DEADLINE.inc()
+            continue
+        if profile is not None:
+            profiles[cache_key] = profile
+            sources[cache_key] = "gemini"
+            matches[cache_key] = FoodMatch(cache_key, missing[cache_key], 1.0)
+    
+    results = []
+    for food_name, storage_type, hours_since_prepared in items:
+        cache_key = normalize_food_name(food_name)
+        profile = profiles.get(cache_key)
+        if profile is None:
+            results.append(fallback_food_analysis(food_name, storage_type, hours_since_prepared))
+        else:
+            if sources[cache_key] != "table":
+                request_frequency.record(matches[cache_key].key, matches[cache_key].food_name)
+            results.append(evaluate_food_safety(food_name, profile, storage_type, hours_since_prepared,
+                                                sources[cache_key], matches[cache_key]))
+    
+    return results
+
+def fetch_gemini_profiles(food_names):
+    """Ask Gemini for the profiles of several foods in one prompt, keyed by normalized food name"""
+    model = get_gemini_model()
+    if not model:
+        FALLBACK_NO_MODEL.inc()
+        logger.error("No working Gemini model available")
+        return {}
+    
+    try:
+        started = time.perf_counter()
+        prompt = "Foods:\n" + "\n".join(f"{number}. {food_name}" for number, food_name in enumerate(food_names, 1))
+        STAGE_PROMPT.observe(time.perf_counter() - started)
+
+        request_logger.info("Sending batch prompt to Gemini for %d foods", len(food_names))
+        response = gemini_breaker.call(timed_generate_content, model, prompt, BATCH_GENERATION_CONFIG)
+        
+        if not response or not response.text:
+            FALLBACK_EMPTY_RESPONSE.inc()
+            logger.warning("Empty response from Gemini")
+            return {}
+        
+        started = time.perf_counter()
+        try:
+            analyses = parse_json_response(response.text, "[")
+        finally:
+            STAGE_JSON_EXTRACT.observe(time.perf_counter() - started)
+        
+        if not isinstance(analyses, list):
+            FALLBACK_NO_JSON.inc()
+            logger.warning("No JSON array found in Gemini batch response")
+            return {}
+        
+        # Match elements by name, falling back to position when names were not echoed back
+        started = time.perf_counter()
+        requested = {normalize_food_name(food_name): food_name for food_name in food_names}
+        profiles = {}
+        for position, analysis in enumerate(analyses):
+            if not isinstance(analysis, dict):
+                logger.warning("Skipping malformed element %d in Gemini batch response", position)
+                continue
+            cache_key = normalize_food_name(str(analysis.get("food_name") or ""))
+            if cache_key not in requested:
+                if position >= len(food_names):
+                    continue
+                cache_key = normalize_food_name(food_names[position])
+            if cache_key in profiles:
+                continue
+            try:
+                profiles[cache_key] = validate_food_profile(requested[cache_key], analysis)
+            except Exception as e:
+                logger.warning("Invalid element %d in Gemini batch response: %s", position, e)
+        STAGE_BACKFILL.observe(time.perf_counter() - started)
+        
+        request_logger.info("Successfully analyzed %d of %d foods with Gemini", len(profiles), len(food_names))
+        return profiles
+        
+    except json.JSONDecodeError as e:
+        FALLBACK_DECODE_ERROR.inc()
+        logger.error("JSON decode error in batch response: %s", e)
+        return {}
+    except CircuitOpenError:
+        FALLBACK_CIRCUIT_OPEN.inc()
+        request_logger.info("Circuit breaker open, skipping Gemini for %d foods", len(food_names))
+        return {}
     except Exception as e:
-        logger.error(f"Error in Gemini analysis: {str(e)}")
-        return fallback_food_analysis(food_name, storage_type, hours_since_prepared)
+        FALLBACK_EXCEPTION.inc()
+        logger.error("Error in Gemini batch analysis: %s", e)
+        return {}
 
-def fallback_food_analysis(food_name, storage_type, hours_since_prepared):
-    """Fallback analysis when Gemini API fails"""
-    logger.info(f"Using fallback analysis for {food_name}")
-    
-    # Try to categorize the food based on common keywords
-    category = "Mixed"  # Default category
-    
-    food_lower = food_name.lower()
-    
-    # Simple keyword-based categorization
-    if any(word in food_lower for word in ["chicken", "beef", "pork", "steak", "burger", "ham", "sausage", "turkey"]):
-        category = "Meat"
-    elif any(word in food_lower for word in ["fish", "shrimp", "salmon", "tuna", "prawn", "lobster", "crab", "seafood"]):
-        category = "Seafood"
-    elif any(word in food_lower for word in ["milk", "cheese", "yogurt", "butter", "cream", "dairy", "paneer"]):
-        category = "Dairy"
-    elif any(word in food_lower for word in ["spinach", "carrot", "broccoli", "potato", "onion", "tomato", "vegetable", "salad"]):
-        category = "Vegetables"
-    elif any(word in food_lower for word in ["apple", "banana", "orange", "grape", "fruit", "berry"]):
-        category = "Fruits"
-    elif any(word in food_lower for word in ["rice", "pasta", "wheat", "bread", "cereal", "grain", "oat"]):
-        category = "Grains"
-    elif any(word in food_lower for word in ["cake", "cookie", "muffin", "pastry", "bread", "baked"]):
-        category = "Baked Goods"
-    
-    # Get default expiry times
-    shelf_life = DEFAULT_EXPIRY.get(category, DEFAULT_EXPIRY["Mixed"])
-    
-    # Determine safety status
-    danger_zone_hour = DANGER_ZONE_HOURS.get(category, 2)
-    high_risk = category in ["Meat", "Seafood", "Dairy", "Mixed"]
+def validate_food_profile(food_name, analysis):
+    """Coerce a Gemini profile to the expected types, back-filling missing or invalid fields from the defaults"""
+    if not isinstance(analysis, dict):
+        raise ValueError("profile is not a JSON object")
+    
+    invalid = []
+    
+    category = CATEGORY_NAMES.get(str(analysis.get("food_category") or "").strip().lower())
+    if category is None:
+        invalid.append("food_category")
+        category = "Mixed"
+    defaults = DEFAULT_EXPIRY[category]
+    
+    # Ensure all storage types are present
+    shelf_life_values = analysis.get("shelf_life")
+    if not isinstance(shelf_life_values, dict):
+        invalid.append("shelf_life")
+        shelf_life_values = {}
+    shelf_life = {}
+    for storage in STORAGE_TYPES:
+        hours = coerce_hours(shelf_life_values.get(storage))
+        if hours is None:
+            invalid.append(f"shelf_life.{storage}")
+            hours = defaults[storage]
+        shelf_life[storage] = hours
+    
+    danger_zone_hours = coerce_hours(analysis.get("danger_zone_hours"))
+    if danger_zone_hours is None:
+        invalid.append("danger_zone_hours")
+        danger_zone_hours = DANGER_ZONE_HOURS[category]
+    
+    high_risk = analysis.get("high_risk")
+    if isinstance(high_risk, str) and high_risk.strip().lower() in ("true", "false"):
+        high_risk = high_risk.strip().lower() == "true"
+    if not isinstance(high_risk, bool):
+        invalid.append("high_risk")
+        high_risk = category in HIGH_RISK_CATEGORIES
     
+    ingredients = coerce_string_list(analysis.get("ingredients"))
+    if not ingredients:
+        invalid.append("ingredients")
+        ingredients = default_ingredients(food_name)
+    
+    guidelines = coerce_string_list(analysis.get("safety_guidelines"))
+    if not guidelines:
+        invalid.append("safety_guidelines")
+        guidelines = default_guidelines(category, high_risk)
+    
+    if invalid:
+        logger.warning("Missing or invalid fields in Gemini response for %s: %s", food_name, ', '.join(invalid))
+    
+    return {
+        "food_category": category,
+        "ingredients": ingredients,
+        "high_risk": high_risk,
+        "danger_zone_hours": danger_zone_hours,
+        "shelf_life": shelf_life,
+        "safety_guidelines": guidelines
+    }
+
+def coerce_hours(value):
+    """Return a non-negative number of hours from a number or a string such as "48 hours", else None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        match = LEADING_NUMBER.match(value)
+        if not match:
+            return None
+        value = float(match.group(1))
+    if not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        return None
+    return int(value) if float(value).is_integer() else value
+
+def coerce_string_list(value):
+    """Return a list of non-empty strings, or an empty list if value is not a list"""
+    if not isinstance(value, list):
+        return []
+    return [str(item).strip() for item in value if isinstance(item, (str, int, float)) and str(item).strip()]
+
+def safety_status_at(shelf_life_hours, danger_zone_hour, storage_type, hours_since_prepared):
+    """Return the safety status of a food after hours_since_prepared in storage_type"""
     # Check storage conditions
     in_danger_zone = storage_type == "Room Temp" and hours_since_prepared > danger_zone_hour
     
-    if hours_since_prepared >= shelf_life[storage_type]:
-        safety_status = "expired"
-        message = f"This {category.lower()} item has expired and should be discarded."
+    if hours_since_prepared >= shelf_life_hours:
+        return "expired"
     elif in_danger_zone:
-        safety_status = "unsafe"
-        message = f"This {category.lower()} has been in the danger zone for too long and may be unsafe."
-    elif hours_since_prepared >= (shelf_life[storage_type] * 0.8):
-        safety_status = "consume_immediately"
-        message = f"This {category.lower()} should be consumed immediately."
-    elif hours_since_prepared >= (shelf_life[storage_type] * 0.6):
-        safety_status = "consume_soon"
-        message = f"This {category.lower()} should be consumed soon."
-    else:
-        safety_status = "safe_today"
-        message = f"This {category.lower()} is safe to consume."
+        return "unsafe"
+    elif hours_since_prepared >= (shelf_life_hours * 0.8):
+        return "consume_immediately"
+    elif hours_since_prepared >= (shelf_life_hours * 0.6):
+        return "consume_soon"
+    return "safe_today"
+
+def safety_timeline(shelf_life_hours, danger_zone_hour, storage_type):
+    """Return the status changes of a food as dicts with status, from_hours and inclusive
+
+    Statuses only change at 60%, 80% and 100% of the shelf life and, at room
+    temperature, right after the danger zone cutoff, so evaluating the status
+    at and just after each of those hours yields the complete schedule.
+    """
+    breakpoints = {0.0, shelf_life_hours * 0.6, shelf_life_hours * 0.8, float(shelf_life_hours)}
+    if storage_type == "Room Temp":
+        breakpoints.add(float(danger_zone_hour))
+    
+    transitions = []
+    current = None
+    for hour in sorted(breakpoints):
+        for inclusive, at in ((True, hour), (False, math.nextafter(hour, math.inf))):
+            status = safety_status_at(shelf_life_hours, danger_zone_hour, storage_type, at)
+            if status != current:
+                transitions.append({"status": status, "from_hours": hour, "inclusive": inclusive})
+                current = status
+    return transitions
+
+def evaluate_food_safety(food_name, profile, storage_type, hours_since_prepared, source, match=None):
+    """Compute the hour-dependent safety status of a food from its profile"""
+    category = profile["food_category"]
+    shelf_life = profile["shelf_life"]
+    danger_zone_hour = profile["danger_zone_hours"]
+    
+    safety_status = safety_status_at(shelf_life[storage_type], danger_zone_hour, storage_type, hours_since_prepared)
+    message = SAFETY_MESSAGES[safety_status].format(category=category.lower())
     
     # Determine recommended storage
     if category in ["Meat", "Seafood", "Dairy"]:
@@ -268,7 +1140,65 @@ def fallback_food_analysis(food_name, storage_type, hours_since_prepared):
     else:
         recommended = storage_type
     
-    # Generate safety guidelines
+    # Construct the response
+    analysis = {
+        "food_name": food_name,
+        "food_category": category,
+        "ingredients": list(profile["ingredients"]),
+        "high_risk": profile["high_risk"],
+        "safety_status": safety_status,
+        "safety_message": message,
+        "danger_zone_hours": danger_zone_hour,
+        "shelf_life": dict(shelf_life),
+        "recommended_storage": recommended,
+        "safety_guidelines": list(profile["safety_guidelines"]),
+        # Add remaining shelf life information
+        "remaining_hours": max(0, shelf_life[storage_type] - hours_since_prepared),
+        # Add hours before unsafe
+        "hours_before_unsafe": max(0, danger_zone_hour - hours_since_prepared) if storage_type == "Room Temp" else None,
+        # Where the profile came from: cache, table, store, gemini or fallback
+        "source": source,
+        # The known food whose profile was used, and how closely its name matched
+        "matched_food_name": match.food_name if match else None,
+        "match_score": match.score if match else None
+    }
+    
+    return analysis
+
+def fallback_food_analysis(food_name, storage_type, hours_since_prepared):
+    """Fallback analysis when Gemini API fails"""
+    started = time.perf_counter()
+    request_logger.info("Using fallback analysis for %s", food_name)
+    analysis = evaluate_food_safety(food_name, fallback_food_profile(food_name), storage_type, hours_since_prepared, "fallback")
+    STAGE_FALLBACK.observe(time.perf_counter() - started)
+    return analysis
+
+def fallback_food_profile(food_name):
+    """Build a keyword-based food profile without calling Gemini"""
+    # Categorize the food with the keyword index, defaulting to Mixed
+    category = food_classifier.classify(food_name) or "Mixed"
+    
+    high_risk = category in HIGH_RISK_CATEGORIES
+    
+    return {
+        "food_category": category,
+        "ingredients": default_ingredients(food_name),
+        "high_risk": high_risk,
+        "danger_zone_hours": DANGER_ZONE_HOURS.get(category, 2),
+        # Get default expiry times
+        "shelf_life": DEFAULT_EXPIRY.get(category, DEFAULT_EXPIRY["Mixed"]),
+        "safety_guidelines": default_guidelines(category, high_risk)
+    }
+
+def default_ingredients(food_name):
+    """Create ingredients based on food name"""
+    ingredients = [part.strip() for part in food_name.lower().split() if len(part.strip()) > 2]
+    if not ingredients:
+        ingredients = [food_name]
+    return ingredients
+
+def default_guidelines(category, high_risk):
+    """Generate safety guidelines for a food category"""
     guidelines = [
         f"Keep {category.lower()} items at safe temperatures.",
         "Wash hands before and after handling food.",
@@ -284,88 +1214,298 @@ def fallback_food_analysis(food_name, storage_type, hours_since_prepared):
     if category == "Seafood":
         guidelines.append("Seafood spoils quickly and should be consumed within 1-2 days of refrigeration.")
     
-    # Create ingredients based on food name
-    ingredients = [part.strip() for part in food_lower.split() if len(part.strip()) > 2]
-    if not ingredients:
-        ingredients = [food_name]
-    
-    # Construct the response
-    analysis = {
-        "food_name": food_name,
-        "food_category": category,
-        "ingredients": ingredients,
-        "high_risk": high_risk,
-        "safety_status": safety_status,
-        "safety_message": message,
-        "danger_zone_hours": danger_zone_hour,
-        "shelf_life": shelf_life,
-        "recommended_storage": recommended,
-        "safety_guidelines": guidelines
-    }
-    
-    return analysis
+    return guidelines
 
 # Serve static files
 @app.route('/')
 def index():
-    return send_from_directory('static', 'index.html')
+    return serve_static('index.html')
 
 @app.route('/static/<path:path>')
 def serve_static(path):
-    return send_from_directory('static', path)
+    """Serve a preloaded static file in the best encoding the client accepts"""
+    asset = static_assets.get(path)
+    if asset is None:
+        # Unknown paths and files too large to preload
+        return send_from_directory('static', path)
+    return asset.response(request)
 
 # Add a specific route for the test interface
 @app.route('/test')
 def test_interface():
-    return send_from_directory('static', 'gemini_food_tester.html')
+    return serve_static('gemini_food_tester.html')
 
 @app.route('/api/food-safety', methods=['POST'])
 def food_safety_endpoint():
     """Endpoint to analyze food safety"""
     try:
+        started = time.perf_counter()
         data = request.get_json()
         
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
-        # Extract parameters
-        food_name = data.get('foodName', '')
-        storage_type = data.get('storageType', 'Room Temp')
-        hours_since_prepared = data.get('hoursSincePrepared', 0)
+        food_name, storage_type, hours_since_prepared, error = parse_food_request(data)
+        STAGE_PARSE.observe(time.perf_counter() - started)
+        if error:
+            return jsonify({"error": error}), 400
         
-        logger.info(f"Analyzing food: {food_name}, Storage: {storage_type}, Hours: {hours_since_prepared}")
+        REQUESTS_BY_STORAGE.labels(storage_type).inc()
         
-        # Validate
-        if not food_name:
-            return jsonify({"error": "Food name is required"}), 400
+        # Analyze food safety
+        analysis = analyze_food_with_gemini(food_name, storage_type, hours_since_prepared)
         
-        if storage_type not in STORAGE_TYPES:
-            return jsonify({"error": f"Invalid storage type. Must be one of: {', '.join(STORAGE_TYPES.keys())}"}), 400
+        return jsonify(analysis)
         
-        try:
-            hours_since_prepared = float(hours_since_prepared)
-        except ValueError:
-            return jsonify({"error": "Hours since prepared must be a number"}), 400
+    except Exception as e:
+        logger.error("Error in food safety endpoint: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/food-safety/batch', methods=['POST'])
+def food_safety_batch_endpoint():
+    """Endpoint to analyze a list of food items with batched Gemini prompts"""
+    try:
+        data = request.get_json()
         
-        # Analyze food safety
-        analysis = analyze_food_with_gemini(food_name, storage_type, hours_since_prepared)
+        if isinstance(data, dict):
+            data = data.get('items')
         
-        # Add remaining shelf life information
-        analysis["remaining_hours"] = max(0, analysis["shelf_life"][storage_type] - hours_since_prepared)
+        if not data or not isinstance(data, list):
+            return jsonify({"error": "A non-empty list of food items is required"}), 400
         
-        # Add hours before unsafe
-        analysis["hours_before_unsafe"] = max(0, analysis["danger_zone_hours"] - hours_since_prepared) if storage_type == "Room Temp" else None
+        if len(data) > BATCH_MAX_ITEMS:
+            return jsonify({"error": f"Too many items. A batch may contain at most {BATCH_MAX_ITEMS} items"}), 400
         
-        return jsonify(analysis)
+        request_logger.info("Analyzing batch of %d food items", len(data))
+        
+        # Validate each item, keeping invalid ones as per-item errors
+        results = [None] * len(data)
+        valid_items = []
+        for index, item in enumerate(data):
+            food_name, storage_type, hours_since_prepared, error = parse_food_request(item)
+            if error:
+                results[index] = {"error": error}
+            else:
+                REQUESTS_BY_STORAGE.labels(storage_type).inc()
+                valid_items.append((index, food_name, storage_type, hours_since_prepared))
+        
+        analyses = analyze_foods_batch([item[1:] for item in valid_items])
+        for (index, *_), analysis in zip(valid_items, analyses):
+            results[index] = analysis
+        
+        return jsonify({"count": len(results), "results": results})
         
     except Exception as e:
-        logger.error(f"Error in food safety endpoint: {str(e)}")
+        logger.error("Error in food safety batch endpoint: %s", e)
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/food-safety/timeline', methods=['POST'])
+def food_safety_timeline_endpoint():
+    """Endpoint returning every future status change of a food so clients can stop polling"""
+    try:
+        data = request.get_json()
+        food_name, storage_type, hours_since_prepared, error = parse_food_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        now = time.time()
+        prepared_at, error = parse_prepared_at(data, hours_since_prepared, now)
+        if error:
+            return jsonify({"error": error}), 400
+        hours_since_prepared = (now - prepared_at) / 3600
+        
+        REQUESTS_BY_STORAGE.labels(storage_type).inc()
+        profile, source, match = resolve_food_profile(food_name)
+        if profile is None:
+            profile, source = fallback_food_profile(food_name), "fallback"
+        
+        shelf_life_hours = profile["shelf_life"][storage_type]
+        danger_zone_hour = profile["danger_zone_hours"]
+        transitions = safety_timeline(shelf_life_hours, danger_zone_hour, storage_type)
+        for transition in transitions:
+            transition["at"] = datetime.fromtimestamp(prepared_at + transition["from_hours"] * 3600).isoformat()
+            transition["from_hours"] = round(transition["from_hours"], 4)
+        
+        return jsonify({
+            "food_name": food_name,
+            "food_category": profile["food_category"],
+            "storage_type": storage_type,
+            "shelf_life_hours": shelf_life_hours,
+            "danger_zone_hours": danger_zone_hour,
+            "danger_zone_cutoff_hours": danger_zone_hour if storage_type == "Room Temp" else None,
+            "prepared_at": datetime.fromtimestamp(prepared_at).isoformat(),
+            "hours_since_prepared": round(hours_since_prepared, 4),
+            "current_status": safety_status_at(shelf_life_hours, danger_zone_hour, storage_type, hours_since_prepared),
+            "transitions": transitions,
+            "source": source,
+            "matched_food_name": match.food_name if match else None,
+            "match_score": match.score if match else None
+        })
+        
+    except Exception as e:
+        logger.error("Error in food safety timeline endpoint: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+def parse_food_request(data):
+    """Extract and validate food request parameters, returning (food_name, storage_type, hours, error)"""
+    if not data or not isinstance(data, dict):
+        return None, None, None, "No data provided"
+    
+    # Extract parameters
+    food_name = data.get('foodName', '')
+    storage_type = data.get('storageType', 'Room Temp')
+    hours_since_prepared = data.get('hoursSincePrepared', 0)
+    
+    request_logger.info("Analyzing food: %s, Storage: %s, Hours: %s", food_name, storage_type, hours_since_prepared)
+    
+    # Validate
+    if not food_name:
+        return None, None, None, "Food name is required"
+    if not isinstance(food_name, str):
+        return None, None, None, "Food name must be a string"
+    
+    if not isinstance(storage_type, str) or storage_type not in STORAGE_TYPES:
+        return None, None, None, f"Invalid storage type. Must be one of: {', '.join(STORAGE_TYPES.keys())}"
+    
+    try:
+        hours_since_prepared = float(hours_since_prepared)
+    except (TypeError, ValueError, OverflowError):
+        return None, None, None, "Hours since prepared must be a number"
+    if not math.isfinite(hours_since_prepared):
+        return None, None, None, "Hours since prepared must be a number"
+    
+    return food_name, storage_type, hours_since_prepared, None
+
+@app.route('/api/inventory', methods=['POST'])
+def add_inventory_item():
+    """Register a food item and index its expiry and danger zone deadlines"""
+    try:
+        data = request.get_json()
+        food_name, storage_type, hours_since_prepared, error = parse_food_request(data)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        now = time.time()
+        prepared_at, error = parse_prepared_at(data, hours_since_prepared, now)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        profile, source, _ = resolve_food_profile(food_name)
+        if profile is None:
+            profile, source = fallback_food_profile(food_name), "fallback"
+        
+        item = inventory.add(food_name, storage_type, prepared_at, profile, source, now=now)
+        return jsonify(inventory_item_response(item)), 201
+        
+    except Exception as e:
+        logger.error("Error in inventory endpoint: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/inventory/<int:item_id>', methods=['GET'])
+def get_inventory_item(item_id):
+    """Return a tracked food item with its current status"""
+    item = inventory.get(item_id)
+    if item is None:
+        return jsonify({"error": "Inventory item not found"}), 404
+    return jsonify(inventory_item_response(item))
+
+@app.route('/api/inventory/<int:item_id>', methods=['PATCH'])
+def move_inventory_item(item_id):
+    """Move a tracked food item to another storage type"""
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data, dict):
+        return jsonify({"error": "No data provided"}), 400
+    storage_type = data.get('storageType')
+    if not isinstance(storage_type, str) or storage_type not in STORAGE_TYPES:
+        return jsonify({"error": f"Invalid storage type. Must be one of: {', '.join(STORAGE_TYPES.keys())}"}), 400
+    
+    item = inventory.move(item_id, storage_type)
+    if item is None:
+        return jsonify({"error": "Inventory item not found"}), 404
+    return jsonify(inventory_item_response(item))
+
+@app.route('/api/inventory/<int:item_id>', methods=['DELETE'])
+def remove_inventory_item(item_id):
+    """Stop tracking a food item"""
+    if not inventory.remove(item_id):
+        return jsonify({"error": "Inventory item not found"}), 404
+    return jsonify({"removed": item_id})
+
+@app.route('/api/inventory/expiring', methods=['GET'])
+def expiring_inventory_items():
+    """Return items that expire within the next N hours, soonest first"""
+    try:
+        hours = float(request.args.get('hours', 24))
+    except ValueError:
+        hours = None
+    if hours is None or not math.isfinite(hours):
+        return jsonify({"error": "hours must be a number"}), 400
+    limit, error = parse_query_limit()
+    if error:
+        return jsonify({"error": error}), 400
+    
+    items = [inventory_item_response(item) for item in inventory.expiring(hours, limit=limit)]
+    return jsonify({"hours": hours, "count": len(items), "items": items})
+
+@app.route('/api/inventory/unsafe', methods=['GET'])
+def unsafe_inventory_items():
+    """Return items that are expired or past their danger zone limit"""
+    limit, error = parse_query_limit()
+    if error:
+        return jsonify({"error": error}), 400
+    
+    items = [inventory_item_response(item) for item in inventory.unsafe(limit=limit)]
+    return jsonify({"count": len(items), "items": items})
+
+def parse_query_limit():
+    """Return (limit, error) from the limit query parameter, capped at INVENTORY_QUERY_LIMIT"""
+    try:
+        limit = int(request.args.get('limit', INVENTORY_QUERY_LIMIT))
+    except ValueError:
+        return None, "limit must be a number"
+    # SQLite reads a negative LIMIT as no limit at all
+    if limit < 1:
+        return None, "limit must be at least 1"
+    return min(limit, INVENTORY_QUERY_LIMIT), None
+
+def parse_prepared_at(data, hours_since_prepared, now):
+    """Return (prepared_at epoch seconds, error) from preparedAt, or from hoursSincePrepared when it is missing"""
+    prepared_at = data.get('preparedAt')
+    if prepared_at is None:
+        prepared_at = now - hours_since_prepared * 3600
+        if not MIN_PREPARED_AT <= prepared_at <= MAX_PREPARED_AT:
+            return None, "hoursSincePrepared is out of range"
+        return prepared_at, None
+    prepared_at = parse_timestamp(prepared_at)
+    if prepared_at is None:
+        return None, "preparedAt must be an ISO 8601 date or a Unix timestamp between 1970 and 3000"
+    return prepared_at, None
+
+def parse_timestamp(value):
+    """Convert an ISO 8601 string or a Unix timestamp to epoch seconds, or None if invalid or out of range"""
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            timestamp = float(value)
+        else:
+            timestamp = datetime.fromisoformat(str(value)).timestamp()
+    except (ValueError, OverflowError, OSError):
+        return None
+    # NaN fails both comparisons
+    if not MIN_PREPARED_AT <= timestamp <= MAX_PREPARED_AT:
+        return None
+    return timestamp
+
+def inventory_item_response(item):
+    """Render the epoch timestamps of an inventory item as ISO 8601 strings"""
+    for field in INVENTORY_TIMESTAMPS:
+        if item[field] is not None:
+            item[field] = datetime.fromtimestamp(item[field]).isoformat()
+    return item
+
 @app.route('/api/storage-types', methods=['GET'])
 def get_storage_types():
     """Return available storage types"""
-    return jsonify(list(STORAGE_TYPES.keys()))
+    return storage_types_asset.response(request)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -374,15 +1514,38 @@ def health_check():
         "status": "ok",
         "timestamp": datetime.now().isoformat(),
         "gemini_model": gemini_model is not None,
-        "gemini_model_name": next((model for model in AVAILABLE_MODELS if gemini_model and model in str(gemini_model)), None) if gemini_model else None,
+        "gemini_model_name": model_probe["model_name"] if gemini_model else None,
+        "gemini_model_probe": dict(model_probe),
+        "profile_cache": profile_cache.stats(),
+        "profile_store": profile_store.stats(),
+        "food_table": food_table.stats() if food_table is not None else None,
+        "food_matcher": food_matcher.stats(),
+        "gemini_circuit_breaker": gemini_breaker.stats(),
+        "inventory_items": len(inventory),
+        "static_assets": static_assets.stats(),
+        "serving_mode": SERVING_MODE,
+        "upstream_calls": dict(upstream_calls, limit=UPSTREAM_CONCURRENCY),
+        "gemini_scheduler": gemini_scheduler.stats(),
+        "refresh_ahead": dict(refresh_ahead.stats(), budget_per_minute=REFRESH_BUDGET_PER_MINUTE),
+        "logging": queue_logging.stats(),
+        "request_profiler": request_profiler.stats(),
         "version": "1.0.0"
     }
     return jsonify(status)
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Expose metrics in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 # For documentation and testing
 @app.route('/api/docs', methods=['GET'])
 def get_api_docs():
     """Return API documentation"""
+    return api_docs_asset.response(request)
+
+def api_docs():
+    """Build the API documentation payload"""
     docs = {
         "api_version": "1.0.0",
         "endpoints": [
@@ -401,6 +1564,74 @@ def get_api_docs():
                     "hoursSincePrepared": 2
                 }
             },
+            {
+                "path": "/api/food-safety/batch",
+                "method": "POST",
+                "description": "Analyze a list of food items, packing many items into each Gemini prompt",
+                "parameters": {
+                    "items": "List of objects with foodName, storageType and hoursSincePrepared (the body may also be the list itself)"
+                },
+                "example_request": {
+                    "items": [
+                        {"foodName": "chicken curry", "storageType": "Room Temp", "hoursSincePrepared": 2},
+                        {"foodName": "apple pie", "storageType": "Refrigerated", "hoursSincePrepared": 24}
+                    ]
+                }
+            },
+            {
+                "path": "/api/food-safety/timeline",
+                "method": "POST",
+                "description": "Return every status change of a food in one call: the hour each status starts at and its absolute time",
+                "parameters": {
+                    "foodName": "Name of the food item (required)",
+                    "storageType": "Storage type (Room Temp, Refrigerated, Frozen)",
+                    "preparedAt": "When the food was prepared (ISO 8601 or Unix timestamp); defaults to now minus hoursSincePrepared",
+                    "hoursSincePrepared": "Hours since the food was prepared, used when preparedAt is missing (number)"
+                },
+                "example_request": {
+                    "foodName": "chicken curry",
+                    "storageType": "Refrigerated",
+                    "hoursSincePrepared": 5
+                }
+            },
+            {
+                "path": "/api/inventory",
+                "method": "POST",
+                "description": "Track a food item; its expiry and danger zone deadlines are indexed for the queries below",
+                "parameters": {
+                    "foodName": "Name of the food item (required)",
+                    "storageType": "Storage type (Room Temp, Refrigerated, Frozen)",
+                    "preparedAt": "When the food was prepared (ISO 8601 or Unix timestamp); defaults to now minus hoursSincePrepared",
+                    "hoursSincePrepared": "Hours since the food was prepared, used when preparedAt is missing (number)"
+                },
+                "example_request": {
+                    "foodName": "chicken curry",
+                    "storageType": "Refrigerated",
+                    "preparedAt": "2024-05-01T18:30:00"
+                }
+            },
+            {
+                "path": "/api/inventory/<id>",
+                "method": "GET, PATCH, DELETE",
+                "description": "Get a tracked item, move it to another storage type (PATCH with storageType) or stop tracking it"
+            },
+            {
+                "path": "/api/inventory/expiring",
+                "method": "GET",
+                "description": "Items still good now that expire within the next N hours, soonest first",
+                "parameters": {
+                    "hours": "Look-ahead window in hours (default 24)",
+                    "limit": f"Maximum number of items, at least 1 (default and maximum {INVENTORY_QUERY_LIMIT})"
+                }
+            },
+            {
+                "path": "/api/inventory/unsafe",
+                "method": "GET",
+                "description": "Items that are expired or have been at room temperature past their danger zone limit",
+                "parameters": {
+                    "limit": f"Maximum number of items, at least 1 (default and maximum {INVENTORY_QUERY_LIMIT})"
+                }
+            },
             {
                 "path": "/api/storage-types",
                 "method": "GET",
@@ -410,10 +1641,17 @@ def get_api_docs():
                 "path": "/api/health",
                 "method": "GET",
                 "description": "Check API health status"
+            },
+            {
+                "path": "/api/metrics",
+                "method": "GET",
+                "description": "Prometheus metrics: per-stage latency histograms, fallback reasons and request counts"
             }
         ]
     }
-    return jsonify(docs)
+    return docs
+
+api_docs_asset = json_asset(api_docs())
 
 if __name__ == '__main__':
     logger.info("Starting Gemini Food Analyzer API server")
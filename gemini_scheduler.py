@@ -0,0 +1,303 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Priorities, most urgent first
+PRIORITY_NAMES = ["interactive", "batch", "background"]
+INTERACTIVE, BATCH, BACKGROUND = range(len(PRIORITY_NAMES))
+
+
+class QueueFullError(Exception):
+    """Raised when a request is rejected because the scheduler queue is full"""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate tokens per second, holding at most capacity"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self):
+        """Take one token, returning 0, or return the seconds until one is available"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def available(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+class _RequestFuture(Future):
+    """Future returned by submit, remembering the food it was queued for so it can be withdrawn"""
+
+    def __init__(self, key):
+        super().__init__()
+        self.key = key
+
+
+class _Request:
+    __slots__ = ("key", "food_name", "priority", "enqueued_at", "future", "waiters")
+
+    def __init__(self, key, food_name, priority):
+        self.key = key
+        self.food_name = food_name
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.future = _RequestFuture(key)
+        self.waiters = 1
+
+
+class GeminiScheduler:
+    """Single queue in front of the model that spends the API quota by priority
+
+    Every Gemini prompt costs one token from the bucket. A dispatcher thread
+    sends the most urgent queued food first, and holds it for batch_window
+    seconds so other foods of the same priority queued meanwhile go out in
+    the same multi-item prompt (up to batch_sizes[priority] foods). Queued
+    requests for the same food share one entry, which moves up if a more
+    urgent caller asks for it, and a food already being fetched shares that
+    call. execute(food_names) runs on a worker thread and returns
+    {key: profile}; foods it has no answer for resolve to None. A caller that
+    stops waiting withdraws its request, and a queued food nobody waits for
+    any more is dropped before it costs quota.
+
+    When max_queue foods are queued, a new food evicts the newest queued food
+    of the least urgent priority below its own, whose Future then fails with
+    QueueFullError; with nothing less urgent queued it is rejected. While
+    ready() is false (the API is known to be failing) batches are handed to
+    execute without taking a token, so they fail fast instead of spending
+    quota.
+    """
+
+    def __init__(self, execute, bucket, key_func, batch_window=0.025, batch_sizes=(5, 25, 25),
+                 max_queue=1000, workers=8, observe_wait=None, ready=None):
+        self.execute = execute
+        self.bucket = bucket
+        self.key_func = key_func
+        self.batch_window = batch_window
+        self.batch_sizes = batch_sizes
+        self.max_queue = max_queue
+        self.observe_wait = observe_wait
+        self.ready = ready
+        self._heap = []
+        self._queued = {}
+        self._running = {}
+        self._depth = [0] * len(PRIORITY_NAMES)
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini-scheduler")
+        self._dispatched = deque()
+        self.submitted = 0
+        self.merged = 0
+        self.rejected = 0
+        self.withdrawn = 0
+        self.evicted = 0
+        self.short_circuited = 0
+        self.prompts = 0
+        self.throttled = 0
+        self._thread = threading.Thread(target=self._run, name="gemini-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, food_name, priority=INTERACTIVE):
+        """Queue a food for Gemini and return a Future resolving to its profile or None"""
+        key = self.key_func(food_name)
+        with self._cond:
+            running = self._running.get(key)
+            if running is not None:
+                self.merged += 1
+                return running.future
+            request = self._queued.get(key)
+            if request is not None:
+                self.merged += 1
+                request.waiters += 1
+                if priority < request.priority:
+                    # The stale heap entry is skipped when it comes up
+                    self._depth[request.priority] -= 1
+                    self._push(request, priority)
+                    self._cond.notify()
+                return request.future
+            if len(self._queued) >= self.max_queue and not self._evict_below(priority):
+                self.rejected += 1
+                raise QueueFullError(f"Gemini scheduler queue is full ({self.max_queue} requests)")
+            request = _Request(key, food_name, priority)
+            self._queued[key] = request
+            self._push(request, priority)
+            self.submitted += 1
+            self._cond.notify()
+            return request.future
+
+    def _evict_below(self, priority):
+        """Drop the newest queued request less urgent than priority, returning whether one was found; callers must hold the lock"""
+        victim = None
+        for request in self._queued.values():
+            if request.priority > priority and (
+                    victim is None or (request.priority, request.enqueued_at) > (victim.priority, victim.enqueued_at)):
+                victim = request
+        if victim is None:
+            return False
+        # The stale heap entry is skipped when it comes up
+        del self._queued[victim.key]
+        self._depth[victim.priority] -= 1
+        self.evicted += 1
+        victim.future.set_exception(QueueFullError("Evicted from the Gemini scheduler queue by more urgent work"))
+        return True
+
+    def withdraw(self, future):
+        """Stop waiting on a Future returned by submit; its food is dropped if still queued and no one else waits
+
+        Only the queued entry that handed out this Future is affected, so a late
+        withdrawal never touches a newer request for the same food.
+        """
+        with self._cond:
+            request = self._queued.get(future.key)
+            if request is None or request.future is not future:
+                return
+            request.waiters -= 1
+            if request.waiters <= 0:
+                # The stale heap entry is skipped when it comes up
+                del self._queued[request.key]
+                self._depth[request.priority] -= 1
+                self.withdrawn += 1
+                request.future.cancel()
+
+    def _push(self, request, priority):
+        request.priority = priority
+        self._depth[priority] += 1
+        heapq.heappush(self._heap, (priority, next(self._order), request))
+
+    def _head(self):
+        """Return the most urgent queued request, dropping stale heap entries; callers must hold the lock"""
+        while self._heap:
+            priority, _, request = self._heap[0]
+            if self._queued.get(request.key) is request and request.priority == priority:
+                return request
+            heapq.heappop(self._heap)
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                head = self._head()
+                if head is None:
+                    self._cond.wait()
+                    continue
+                # Hold the head back briefly so more foods can join its prompt
+                remaining = head.enqueued_at + self.batch_window - time.monotonic()
+                if remaining > 0 and self._depth[head.priority] < self.batch_sizes[head.priority]:
+                    self._cond.wait(remaining)
+                    continue
+
+            if self.ready is not None and not self.ready():
+                # Calls would be refused anyway; let them fail without spending a token
+                with self._cond:
+                    batch = self._pop_batch(charged=False)
+                if batch:
+                    self.short_circuited += 1
+                    self._executor.submit(self._execute, batch)
+                continue
+
+            with self._cond:
+                if self._head() is None:
+                    # Everything queued was withdrawn or evicted meanwhile
+                    continue
+                # Charged and dequeued under one lock, so no withdrawal can leave a token without a prompt
+                delay = self.bucket.take()
+                if delay > 0:
+                    self.throttled += 1
+                    self._cond.wait(delay)
+                    continue
+                batch = self._pop_batch()
+            self._executor.submit(self._execute, batch)
+
+    def _pop_batch(self, charged=True):
+        """Dequeue up to a prompt's worth of requests sharing the head's priority; callers must hold the lock
+
+        Batches that are not charged took no token and do not count towards the quota used.
+        """
+        head = self._head()
+        if head is None:
+            return []
+        priority = head.priority
+        batch = []
+        now = time.monotonic()
+        while len(batch) < self.batch_sizes[priority]:
+            request = self._head()
+            if request is None or request.priority != priority:
+                break
+            heapq.heappop(self._heap)
+            del self._queued[request.key]
+            self._running[request.key] = request
+            self._depth[priority] -= 1
+            batch.append(request)
+            if self.observe_wait is not None:
+                self.observe_wait(PRIORITY_NAMES[priority], now - request.enqueued_at)
+        if charged:
+            self.prompts += 1
+            self._dispatched.append(now)
+            while self._dispatched[0] < now - 60:
+                self._dispatched.popleft()
+        return batch
+
+    def _execute(self, batch):
+        try:
+            results = self.execute([request.food_name for request in batch])
+        except Exception as e:
+            results, error = {}, e
+        else:
+            error = None
+        with self._cond:
+            for request in batch:
+                del self._running[request.key]
+        for request in batch:
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(results.get(request.key))
+
+    def quota_used(self):
+        """Return the number of prompts sent in the last minute"""
+        cutoff = time.monotonic() - 60
+        with self._cond:
+            while self._dispatched and self._dispatched[0] < cutoff:
+                self._dispatched.popleft()
+            return len(self._dispatched)
+
+    def depth(self):
+        """Return the queued requests per priority name"""
+        with self._cond:
+            return dict(zip(PRIORITY_NAMES, self._depth))
+
+    def stats(self):
+        """Return queue depth, quota use and request counters"""
+        return {
+            "queued": self.depth(),
+            "max_queue": self.max_queue,
+            "quota_per_minute": round(self.bucket.rate * 60, 2),
+            "quota_burst": self.bucket.capacity,
+            "quota_used_last_minute": self.quota_used(),
+            "tokens_available": round(self.bucket.available(), 2),
+            "submitted": self.submitted,
+            "merged": self.merged,
+            "rejected": self.rejected,
+            "withdrawn": self.withdrawn,
+            "evicted": self.evicted,
+            "short_circuited": self.short_circuited,
+            "prompts": self.prompts,
+            "throttled": self.throttled
+        }
@@ -0,0 +1,12 @@
+"""Gunicorn settings, loaded automatically when gunicorn starts from this directory.
+
+SERVING_MODE=sync (default) keeps gunicorn's standard workers. SERVING_MODE=async
+runs gevent workers: the Flask routes stay unchanged, but a worker blocked on a
+Gemini call yields to other requests, so one process can hold hundreds of
+pending analyses. UPSTREAM_CONCURRENCY caps the Gemini calls in flight.
+"""
+import os
+
+if os.getenv('SERVING_MODE', 'sync') == 'async':
+    worker_class = 'gevent'
+    worker_connections = int(os.getenv('ASYNC_WORKER_CONNECTIONS', 1000))
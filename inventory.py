@@ -0,0 +1,189 @@
+import os
+import sqlite3
+import time
+
+from sqlite_pool import ConnectionPool
+
+DEFAULT_INVENTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'inventory.db')
+
+STORAGE_COLUMNS = {
+    "Room Temp": "shelf_room_temp",
+    "Refrigerated": "shelf_refrigerated",
+    "Frozen": "shelf_frozen"
+}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS inventory_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        food_name TEXT NOT NULL,
+        food_category TEXT NOT NULL,
+        profile_source TEXT NOT NULL,
+        storage_type TEXT NOT NULL,
+        prepared_at REAL NOT NULL,
+        storage_since REAL NOT NULL,
+        life_used REAL NOT NULL DEFAULT 0,
+        room_temp_hours REAL NOT NULL DEFAULT 0,
+        shelf_room_temp REAL NOT NULL,
+        shelf_refrigerated REAL NOT NULL,
+        shelf_frozen REAL NOT NULL,
+        danger_zone_hours REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        unsafe_at REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS inventory_expires_at ON inventory_items (expires_at)",
+    "CREATE INDEX IF NOT EXISTS inventory_unsafe_at ON inventory_items (unsafe_at)"
+]
+
+COLUMNS = ("id, food_name, food_category, profile_source, storage_type, prepared_at, storage_since, "
+           "life_used, room_temp_hours, shelf_room_temp, shelf_refrigerated, shelf_frozen, "
+           "danger_zone_hours, expires_at, unsafe_at")
+
+
+def compute_deadlines(storage_type, storage_since, life_used, room_temp_hours, shelf_life, danger_zone_hours,
+                      unsafe_at=None):
+    """Return (expires_at, unsafe_at) epoch seconds for an item in its current storage
+
+    Shelf life is consumed proportionally: an item that used 30% of its room
+    temperature shelf life has 70% of its refrigerated shelf life left once
+    moved. Hours at room temperature accumulate towards the danger zone limit,
+    and an item that crossed it stays unsafe.
+    """
+    expires_at = storage_since + max(0.0, 1 - life_used) * shelf_life[storage_type] * 3600
+    if unsafe_at is None and storage_type == "Room Temp":
+        unsafe_at = storage_since + max(0.0, danger_zone_hours - room_temp_hours) * 3600
+    return expires_at, unsafe_at
+
+
+class InventoryStore:
+    """Tracked food items with deadline indexes shared by all workers
+
+    The B-tree indexes on expires_at and unsafe_at keep items ordered by
+    deadline, so "expiring in the next N hours" and "now unsafe" are range
+    scans costing O(log n + k), and a storage move rewrites a single row.
+    """
+
+    def __init__(self, path=DEFAULT_INVENTORY_PATH, pool_size=8):
+        self.path = path
+        self._pool = ConnectionPool(path, size=pool_size, row_factory=sqlite3.Row,
+                                    setup=("PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"))
+        with self._pool.connection() as conn, conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+
+    def add(self, food_name, storage_type, prepared_at, profile, profile_source, now=None):
+        """Register an item prepared at prepared_at and kept in storage_type since then"""
+        now = time.time() if now is None else now
+        shelf_life = profile["shelf_life"]
+        danger_zone_hours = profile["danger_zone_hours"]
+        expires_at, unsafe_at = compute_deadlines(storage_type, prepared_at, 0.0, 0.0,
+                                                  shelf_life, danger_zone_hours)
+        with self._pool.connection() as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO inventory_items (food_name, food_category, profile_source, storage_type, "
+                "prepared_at, storage_since, shelf_room_temp, shelf_refrigerated, shelf_frozen, "
+                "danger_zone_hours, expires_at, unsafe_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (food_name, profile["food_category"], profile_source, storage_type, prepared_at, prepared_at,
+                 shelf_life["Room Temp"], shelf_life["Refrigerated"], shelf_life["Frozen"],
+                 danger_zone_hours, expires_at, unsafe_at)
+            )
+        return self.get(cursor.lastrowid, now)
+
+    def get(self, item_id, now=None):
+        with self._pool.connection() as conn:
+            row = conn.execute(f"SELECT {COLUMNS} FROM inventory_items WHERE id = ?", (item_id,)).fetchone()
+        return self._to_item(row, now) if row else None
+
+    def move(self, item_id, storage_type, now=None):
+        """Move an item to another storage type, updating its deadlines in place"""
+        now = time.time() if now is None else now
+        with self._pool.connection() as conn, conn:
+            row = conn.execute(f"SELECT {COLUMNS} FROM inventory_items WHERE id = ?", (item_id,)).fetchone()
+            if row is None:
+                return None
+            if row["storage_type"] == storage_type:
+                return self._to_item(row, now)
+
+            shelf_life = {storage: row[column] for storage, column in STORAGE_COLUMNS.items()}
+            hours_in_storage = max(0.0, now - row["storage_since"]) / 3600
+            previous_shelf = shelf_life[row["storage_type"]]
+            life_used = row["life_used"] + (hours_in_storage / previous_shelf if previous_shelf else 1.0)
+            room_temp_hours = row["room_temp_hours"]
+            if row["storage_type"] == "Room Temp":
+                room_temp_hours += hours_in_storage
+
+            # Keep the danger zone deadline only if it has already passed
+            unsafe_at = row["unsafe_at"] if row["unsafe_at"] is not None and row["unsafe_at"] <= now else None
+            expires_at, unsafe_at = compute_deadlines(storage_type, now, life_used, room_temp_hours,
+                                                      shelf_life, row["danger_zone_hours"], unsafe_at)
+            conn.execute(
+                "UPDATE inventory_items SET storage_type = ?, storage_since = ?, life_used = ?, "
+                "room_temp_hours = ?, expires_at = ?, unsafe_at = ? WHERE id = ?",
+                (storage_type, now, life_used, room_temp_hours, expires_at, unsafe_at, item_id)
+            )
+        return self.get(item_id, now)
+
+    def remove(self, item_id):
+        with self._pool.connection() as conn, conn:
+            return conn.execute("DELETE FROM inventory_items WHERE id = ?", (item_id,)).rowcount > 0
+
+    def expiring(self, within_hours, limit=100, now=None):
+        """Return items that are still good now but expire within the next within_hours, soonest first"""
+        now = time.time() if now is None else now
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {COLUMNS} FROM inventory_items WHERE expires_at > ? AND expires_at <= ? "
+                "ORDER BY expires_at LIMIT ?",
+                (now, now + within_hours * 3600, limit)
+            ).fetchall()
+        return [self._to_item(row, now) for row in rows]
+
+    def unsafe(self, limit=100, now=None):
+        """Return items that are expired or past their danger zone limit, earliest deadline first"""
+        now = time.time() if now is None else now
+        # Two index range scans merged here; an OR in one query could fall back to a table scan
+        with self._pool.connection() as conn:
+            expired = conn.execute(
+                f"SELECT {COLUMNS} FROM inventory_items WHERE expires_at <= ? ORDER BY expires_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            danger = conn.execute(
+                f"SELECT {COLUMNS} FROM inventory_items WHERE unsafe_at <= ? ORDER BY unsafe_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+        rows = {row["id"]: row for row in expired + danger}
+        items = [self._to_item(row, now) for row in rows.values()]
+        items.sort(key=lambda item: item["unsafe_since"])
+        return items[:limit]
+
+    def __len__(self):
+        with self._pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM inventory_items").fetchone()[0]
+
+    def _to_item(self, row, now=None):
+        now = time.time() if now is None else now
+        expires_at = row["expires_at"]
+        unsafe_at = row["unsafe_at"]
+        if expires_at <= now:
+            status = "expired"
+        elif unsafe_at is not None and unsafe_at <= now:
+            status = "unsafe"
+        else:
+            status = "ok"
+        unsafe_since = min(expires_at, unsafe_at) if unsafe_at is not None else expires_at
+        return {
+            "id": row["id"],
+            "food_name": row["food_name"],
+            "food_category": row["food_category"],
+            "profile_source": row["profile_source"],
+            "storage_type": row["storage_type"],
+            "prepared_at": row["prepared_at"],
+            "storage_since": row["storage_since"],
+            "expires_at": expires_at,
+            "unsafe_at": unsafe_at,
+            "unsafe_since": unsafe_since,
+            "status": status,
+            "remaining_hours": round(max(0.0, expires_at - now) / 3600, 2),
+            "hours_before_unsafe": round(max(0.0, unsafe_at - now) / 3600, 2) if unsafe_at is not None else None
+        }
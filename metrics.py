@@ -0,0 +1,187 @@
+import threading
+from bisect import bisect_left
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow model calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        # One slot per bucket plus the +Inf overflow slot; made cumulative when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric:
+    """Metric with at most one label whose children are created up front
+
+    Hot paths hold on to the child returned by labels() so recording a sample
+    is a single locked increment with no allocation.
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, label_name=None, label_values=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_name = label_name
+        self._children = {}
+        self._lock = threading.Lock()
+        if label_name is None:
+            self._children[None] = self._new_child()
+        for value in label_values:
+            self.labels(value)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, value):
+        """Return the child for a label value, creating it on first use"""
+        child = self._children.get(value)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(value, self._new_child())
+        return child
+
+    def _label(self, value, extra=None):
+        pairs = []
+        if self.label_name is not None:
+            pairs.append(f'{self.label_name}="{_escape(value)}"')
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for value, child in list(self._children.items()):
+            lines.extend(self._render_child(value, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._children[None].inc(amount)
+
+    def _render_child(self, value, child):
+        return [f"{self.name}{self._label(value)} {_format_value(child.value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, label_name=None, label_values=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, label_name, label_values)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._children[None].observe(value)
+
+    def _render_child(self, value, child):
+        with child._lock:
+            counts = list(child.counts)
+            total = child.sum
+            count = child.count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else _format_value(bound)
+            labels = self._label(value, 'le="' + le + '"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label(value)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{self._label(value)} {count}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose samples are read from a callback returning {label_value: number} at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, label_name, callback):
+        self._callback = callback
+        super().__init__(name, documentation, label_name)
+
+    def _new_child(self):
+        return None
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for value, sample in self._callback().items():
+            lines.append(f"{self.name}{self._label(value)} {_format_value(sample)}")
+        return lines
+
+
+class CallbackCounter(CallbackGauge):
+    """Counter read from a callback at scrape time, for totals kept by the objects being measured"""
+
+    kind = "counter"
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def callback_gauge(self, *args, **kwargs):
+        return self.register(CallbackGauge(*args, **kwargs))
+
+    def callback_counter(self, *args, **kwargs):
+        return self.register(CallbackCounter(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
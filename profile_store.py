@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+"""SQLite-backed store of validated food profiles shared by all workers.
+
+Usage:
+    python profile_store.py export profiles.jsonl
+    python profile_store.py import profiles.jsonl
+    python profile_store.py purge
+    python profile_store.py stats
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from sqlite_pool import ConnectionPool
+
+logger = logging.getLogger('gemini_food_analyzer.profile_store')
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profile_store.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    food_key TEXT PRIMARY KEY,
+    food_name TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# Background refreshes claimed by any worker; rows older than a minute only matter while their lease runs
+LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS refresh_leases (
+    food_key TEXT PRIMARY KEY,
+    claimed_at REAL NOT NULL,
+    leased_until REAL NOT NULL
+)
+"""
+
+
+class ProfileStore:
+    """Persistent food profile store in WAL mode, safe to share between processes"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH, ttl_seconds=30 * 86400, pool_size=8, hit_flush_seconds=30):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.hit_flush_seconds = hit_flush_seconds
+        self._pool = ConnectionPool(path, size=pool_size,
+                                    setup=("PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        # Per-food hit counts are kept here and written in one transaction every hit_flush_seconds,
+        # so reads never take the write lock
+        self._pending_hits = {}
+        self._hits_flushed_at = time.monotonic()
+        with self._pool.connection() as conn, conn:
+            conn.execute(SCHEMA)
+            conn.execute(LEASE_SCHEMA)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, food_key, count_hit=True):
+        """Return the stored profile for food_key, or None if missing, expired or unreadable
+
+        Internal reads pass count_hit=False so they do not make a food look popular.
+        """
+        try:
+            with self._pool.connection() as conn:
+                row = conn.execute(
+                    "SELECT profile FROM profiles WHERE food_key = ? AND updated_at > ?",
+                    (food_key, time.time() - self.ttl_seconds)
+                ).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            profile = json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            self._count("errors")
+            logger.warning("Profile store lookup failed for %s: %s", food_key, e)
+            return None
+        with self._lock:
+            self.hits += 1
+            if count_hit:
+                self._pending_hits[food_key] = self._pending_hits.get(food_key, 0) + 1
+            flush = time.monotonic() - self._hits_flushed_at >= self.hit_flush_seconds
+        if flush:
+            self.flush_hits()
+        return profile
+
+    def flush_hits(self):
+        """Add the hit counts gathered since the last flush to the stored entries"""
+        with self._lock:
+            pending, self._pending_hits = self._pending_hits, {}
+            self._hits_flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            with self._pool.connection() as conn, conn:
+                conn.executemany("UPDATE profiles SET hits = hits + ? WHERE food_key = ?",
+                                 [(hits, food_key) for food_key, hits in pending.items()])
+        except sqlite3.Error as e:
+            self._count("errors")
+            logger.warning("Profile store hit count update failed: %s", e)
+
+    def updated_at(self, food_key):
+        """Return when food_key was last written as an epoch timestamp, or None if it is missing"""
+        try:
+            with self._pool.connection() as conn:
+                row = conn.execute(
+                    "SELECT updated_at FROM profiles WHERE food_key = ?", (food_key,)).fetchone()
+        except sqlite3.Error as e:
+            self._count("errors")
+            logger.warning("Profile store lookup failed for %s: %s", food_key, e)
+            return None
+        return row[0] if row else None
+
+    def put(self, food_key, food_name, profile, updated_at=None):
+        """Insert or replace a profile, keeping its hit count"""
+        try:
+            with self._pool.connection() as conn, conn:
+                conn.execute(
+                    "INSERT INTO profiles (food_key, food_name, profile, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(food_key) DO UPDATE SET food_name = excluded.food_name, "
+                    "profile = excluded.profile, updated_at = excluded.updated_at",
+                    (food_key, food_name, json.dumps(profile), updated_at or time.time())
+                )
+        except sqlite3.Error as e:
+            self._count("errors")
+            logger.warning("Profile store write failed for %s: %s", food_key, e)
+
+    def claim_refresh(self, food_key, lease_seconds, budget_per_minute):
+        """Lease food_key for a background refresh within a budget shared by every process
+
+        Returns "claimed", "leased" if another worker holds an unexpired lease,
+        "budget" if budget_per_minute refreshes were claimed in the last minute,
+        or "error" if the store could not be written.
+        """
+        now = time.time()
+        try:
+            with self._pool.connection() as conn, conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM refresh_leases WHERE leased_until < ? AND claimed_at < ?",
+                             (now, now - 60))
+                row = conn.execute("SELECT leased_until FROM refresh_leases WHERE food_key = ?",
+                                   (food_key,)).fetchone()
+                if row is not None and row[0] > now:
+                    return "leased"
+                claimed = conn.execute("SELECT COUNT(*) FROM refresh_leases WHERE claimed_at > ?",
+                                       (now - 60,)).fetchone()[0]
+                if claimed >= budget_per_minute:
+                    return "budget"
+                conn.execute(
+                    "INSERT INTO refresh_leases (food_key, claimed_at, leased_until) VALUES (?, ?, ?) "
+                    "ON CONFLICT(food_key) DO UPDATE SET claimed_at = excluded.claimed_at, "
+                    "leased_until = excluded.leased_until",
+                    (food_key, now, now + lease_seconds)
+                )
+            return "claimed"
+        except sqlite3.Error as e:
+            self._count("errors")
+            logger.warning("Refresh lease failed for %s: %s", food_key, e)
+            return "error"
+
+    def release_refresh(self, food_key):
+        """Drop a lease taken by claim_refresh, returning its share of the budget"""
+        try:
+            with self._pool.connection() as conn, conn:
+                conn.execute("DELETE FROM refresh_leases WHERE food_key = ?", (food_key,))
+        except sqlite3.Error as e:
+            self._count("errors")
+            logger.warning("Refresh lease release failed for %s: %s", food_key, e)
+
+    def hottest(self, limit):
+        """Return (food_key, profile) pairs for the most requested unexpired entries"""
+        self.flush_hits()
+        try:
+            with self._pool.connection() as conn:
+                rows = conn.execute(
+                    "SELECT food_key, profile FROM profiles WHERE updated_at > ? ORDER BY hits DESC LIMIT ?",
+                    (time.time() - self.ttl_seconds, limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("Profile store preload failed: %s", e)
+            return []
+        return [(food_key, json.loads(profile)) for food_key, profile in rows]
+
+    def names(self, limit):
+        """Return (food_key, food_name) pairs for the most requested unexpired entries"""
+        self.flush_hits()
+        try:
+            with self._pool.connection() as conn:
+                return conn.execute(
+                    "SELECT food_key, food_name FROM profiles WHERE updated_at > ? ORDER BY hits DESC LIMIT ?",
+                    (time.time() - self.ttl_seconds, limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("Profile store name listing failed: %s", e)
+            return []
+
+    def purge_expired(self):
+        """Delete expired entries and return how many were removed"""
+        with self._pool.connection() as conn, conn:
+            cursor = conn.execute("DELETE FROM profiles WHERE updated_at <= ?",
+                                  (time.time() - self.ttl_seconds,))
+            return cursor.rowcount
+
+    def export_jsonl(self, f):
+        """Write every entry as one JSON object per line and return the count"""
+        self.flush_hits()
+        count = 0
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT food_key, food_name, profile, updated_at, hits FROM profiles ORDER BY food_key")
+            for food_key, food_name, profile, updated_at, hits in rows:
+                f.write(json.dumps({
+                    "food_key": food_key,
+                    "food_name": food_name,
+                    "profile": json.loads(profile),
+                    "updated_at": updated_at,
+                    "hits": hits
+                }) + "\n")
+                count += 1
+        return count
+
+    def import_jsonl(self, f):
+        """Load entries written by export_jsonl, keeping the newer copy on conflict"""
+        count = 0
+        with self._pool.connection() as conn, conn:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                conn.execute(
+                    "INSERT INTO profiles (food_key, food_name, profile, updated_at, hits) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(food_key) DO UPDATE SET food_name = excluded.food_name, "
+                    "profile = excluded.profile, updated_at = excluded.updated_at, "
+                    "hits = max(hits, excluded.hits) WHERE excluded.updated_at > profiles.updated_at",
+                    (entry["food_key"], entry["food_name"], json.dumps(entry["profile"]),
+                     entry.get("updated_at") or time.time(), entry.get("hits", 0))
+                )
+                count += 1
+        return count
+
+    def __len__(self):
+        with self._pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def stats(self):
+        """Return lookup counters and the number of stored entries"""
+        try:
+            size = len(self)
+        except sqlite3.Error:
+            size = None
+        with self._lock:
+            return {
+                "path": self.path,
+                "size": size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the shared food profile store")
+    parser.add_argument("--path", default=os.getenv('PROFILE_STORE_PATH', DEFAULT_STORE_PATH),
+                        help="SQLite database file")
+    parser.add_argument("--ttl", type=float, default=float(os.getenv('PROFILE_STORE_TTL_SECONDS', 30 * 86400)),
+                        help="entry expiry in seconds")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="export the store as JSONL")
+    export_parser.add_argument("file", help="output file, or - for stdout")
+    import_parser = commands.add_parser("import", help="import a JSONL export")
+    import_parser.add_argument("file", help="input file, or - for stdin")
+    commands.add_parser("purge", help="delete expired entries")
+    commands.add_parser("stats", help="show the number of stored entries")
+    args = parser.parse_args()
+
+    store = ProfileStore(args.path, ttl_seconds=args.ttl)
+    if args.command == "export":
+        if args.file == "-":
+            count = store.export_jsonl(sys.stdout)
+        else:
+            with open(args.file, 'w', encoding='utf-8') as f:
+                count = store.export_jsonl(f)
+        print(f"Exported {count} profiles", file=sys.stderr)
+    elif args.command == "import":
+        if args.file == "-":
+            count = store.import_jsonl(sys.stdin)
+        else:
+            with open(args.file, encoding='utf-8') as f:
+                count = store.import_jsonl(f)
+        print(f"Imported {count} profiles", file=sys.stderr)
+    elif args.command == "purge":
+        print(f"Removed {store.purge_expired()} expired profiles", file=sys.stderr)
+    else:
+        print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import atexit
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class SamplingFilter(logging.Filter):
+    """Let through a fraction of a logger's records below WARNING
+
+    Warnings and errors always pass. The decision is made before the
+    message is formatted, so a dropped record costs one random() call.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self.sampled_out = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or random.random() < self.rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class LazyQueueHandler(QueueHandler):
+    """Queue records unformatted, leaving all formatting to the listener thread
+
+    QueueHandler.prepare() formats the message on the calling thread so the
+    record can be pickled; records here stay in process, so that work is
+    deferred. When the queue is full the record is dropped and counted
+    rather than blocking the request.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class QueueLogging:
+    """Root logging routed through a bounded queue to a background writer thread"""
+
+    def __init__(self, level=logging.INFO, fmt=DEFAULT_FORMAT, sample_rates=None, queue_size=10000):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = LazyQueueHandler(self.queue)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(fmt))
+        self.listener = QueueListener(self.queue, stream_handler, respect_handler_level=True)
+        self.filters = {}
+        for name, rate in (sample_rates or {}).items():
+            if rate < 1:
+                self.filters[name] = SamplingFilter(rate)
+                logging.getLogger(name).addFilter(self.filters[name])
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(self.handler)
+        self.listener.start()
+        # Flush queued records on shutdown
+        atexit.register(self.listener.stop)
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "sampled_out": {name: sampling.sampled_out for name, sampling in self.filters.items()}
+        }
+
+
+def parse_sample_rates(value):
+    """Parse "logger=rate,logger=rate" into {logger: rate}, raising ValueError on bad entries"""
+    rates = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        name, separator, rate = entry.partition("=")
+        if not separator or not name.strip():
+            raise ValueError(f"invalid log sample rate {entry!r}, expected logger=rate")
+        rates[name.strip()] = float(rate)
+    return rates
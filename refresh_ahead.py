@@ -0,0 +1,108 @@
+import heapq
+import logging
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger('gemini_food_analyzer.refresh_ahead')
+
+
+class RequestFrequency:
+    """Exponentially decayed request counts per normalized food name
+
+    Counts halve every half_life seconds, so the hottest names follow current
+    traffic. At most max_tracked names are kept; when the limit is passed the
+    coldest half is forgotten.
+    """
+
+    def __init__(self, half_life=3600, max_tracked=10000):
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self._counts = {}
+        self._names = {}
+        self._decayed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, key, food_name):
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0.0) + 1
+            self._names[key] = food_name
+            if len(self._counts) > self.max_tracked:
+                keep = heapq.nlargest(self.max_tracked // 2, self._counts.items(), key=lambda item: item[1])
+                self._counts = dict(keep)
+                self._names = {key: self._names[key] for key in self._counts}
+
+    def decay(self):
+        """Age the counts by the time since the last decay, dropping names that have gone cold"""
+        now = time.monotonic()
+        with self._lock:
+            factor = 0.5 ** ((now - self._decayed_at) / self.half_life)
+            self._decayed_at = now
+            for key in list(self._counts):
+                count = self._counts[key] * factor
+                if count < 0.01:
+                    del self._counts[key]
+                    del self._names[key]
+                else:
+                    self._counts[key] = count
+
+    def hottest(self, limit):
+        """Return (key, food_name, count) for the most requested names, hottest first"""
+        with self._lock:
+            top = heapq.nlargest(limit, self._counts.items(), key=lambda item: item[1])
+            return [(key, self._names[key], count) for key, count in top]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._counts)
+
+
+class RefreshAhead:
+    """Background worker that keeps the hottest profiles from expiring
+
+    Every interval seconds the counts are decayed and refresh(key, food_name)
+    is called for each of the hot_set_size most requested names, hottest
+    first. refresh decides what the entry needs and returns a short outcome
+    name, which is counted for stats().
+    """
+
+    def __init__(self, frequency, refresh, hot_set_size=100, interval=30):
+        self.frequency = frequency
+        self.refresh = refresh
+        self.hot_set_size = hot_set_size
+        self.interval = interval
+        self.outcomes = Counter()
+        self.passes = 0
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.hot_set_size > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="refresh-ahead", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Refresh-ahead pass failed")
+
+    def run_once(self):
+        """Visit the hot set once"""
+        self.frequency.decay()
+        self.passes += 1
+        for key, food_name, _ in self.frequency.hottest(self.hot_set_size):
+            self.outcomes[self.refresh(key, food_name)] += 1
+
+    def stats(self):
+        return {
+            "hot_set_size": self.hot_set_size,
+            "interval_seconds": self.interval,
+            "tracked": len(self.frequency),
+            "passes": self.passes,
+            "outcomes": dict(self.outcomes)
+        }
@@ -0,0 +1,187 @@
+import cProfile
+import hmac
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_MODES = ("cprofile", "wall")
+
+
+def current_frame_reader():
+    """Return a callable reading the calling thread's current frame
+
+    Under gevent every request is a greenlet sharing one OS thread, so the
+    greenlet's own frame is read instead. The sampler is then a greenlet too
+    and only runs while the request is switched out, e.g. waiting on Gemini.
+    """
+    monkey = sys.modules.get("gevent.monkey")
+    if monkey is not None and monkey.is_module_patched("threading"):
+        from greenlet import getcurrent
+        current = getcurrent()
+        return lambda: current.gr_frame
+    thread_id = threading.get_ident()
+    return lambda: sys._current_frames().get(thread_id)
+
+
+class WallClockSampler:
+    """Sample one thread's stack at a fixed interval from a helper thread
+
+    Unlike cProfile this sees time spent blocked, e.g. waiting on a Gemini
+    future, and adds no overhead to the profiled thread itself. Stacks are
+    kept in the folded format read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, current_frame, interval):
+        self.current_frame = current_frame
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="wall-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = self.current_frame()
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileSession:
+    """A request being profiled"""
+
+    def __init__(self, mode, interval, reason):
+        self.mode = mode
+        self.reason = reason
+        self.started = time.perf_counter()
+        if mode == "wall":
+            self._profiler = WallClockSampler(current_frame_reader(), interval)
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop(self):
+        """Stop collecting and return the request duration in seconds"""
+        if self.mode == "wall":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+        return time.perf_counter() - self.started
+
+    def write(self, path):
+        if self.mode == "wall":
+            self._profiler.write(path)
+        else:
+            self._profiler.dump_stats(path)
+
+
+class RequestProfiler:
+    """Opt-in per-request profiling, written to files in a local directory
+
+    A request is profiled when it carries the trigger header with the
+    configured token, or at random with probability sample_rate. Sampled
+    profiles faster than min_duration are discarded, so the directory only
+    collects latency outliers; requested ones are always kept. The oldest
+    files are removed once more than max_files exist.
+    """
+
+    def __init__(self, directory, sample_rate=0.0, header_token=None, mode="cprofile",
+                 interval=0.005, min_duration=0.0, max_files=200):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"profile mode must be one of {', '.join(PROFILE_MODES)}, not {mode!r}")
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.header_token = header_token
+        self.mode = mode
+        self.interval = interval
+        self.min_duration = min_duration
+        self.max_files = max_files
+        self.saved = 0
+        self.discarded = 0
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        # cProfile allows one active profiler per process on Python 3.12+
+        self._cprofile_active = False
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0 or bool(self.header_token)
+
+    def start(self, header_value):
+        """Return a ProfileSession if this request should be profiled, otherwise None"""
+        if self.header_token and header_value and hmac.compare_digest(header_value.encode("utf-8"), self.header_token.encode("utf-8")):
+            reason = "requested"
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            reason = "sampled"
+        else:
+            return None
+        if self.mode == "cprofile":
+            with self._lock:
+                if self._cprofile_active:
+                    return None
+                self._cprofile_active = True
+        return ProfileSession(self.mode, self.interval, reason)
+
+    def finish(self, session, method, path, status):
+        """Stop the session and write its profile, returning the file name or None if it was discarded"""
+        try:
+            duration = session.stop()
+        finally:
+            if session.mode == "cprofile":
+                with self._lock:
+                    self._cprofile_active = False
+        if session.reason == "sampled" and duration < self.min_duration:
+            self.discarded += 1
+            return None
+
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-') or 'root'
+        extension = "folded" if session.mode == "wall" else "prof"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence)}-{method}-{slug[:60]}-{status}-{duration * 1000:.0f}ms.{extension}"
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        session.write(tmp_path)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+        with self._lock:
+            self.saved += 1
+            self._prune()
+        return name
+
+    def _prune(self):
+        files = [entry for entry in os.scandir(self.directory)
+                 if entry.is_file() and entry.name.endswith((".prof", ".folded"))]
+        if len(files) > self.max_files:
+            files.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in files[:len(files) - self.max_files]:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "mode": self.mode,
+            "sample_rate": self.sample_rate,
+            "header_enabled": bool(self.header_token),
+            "directory": self.directory,
+            "saved": self.saved,
+            "discarded": self.discarded
+        }
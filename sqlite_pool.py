@@ -0,0 +1,53 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by threads and greenlets
+
+    threading.local gives every gevent greenlet a connection of its own, so a
+    worker holding hundreds of requests would open as many connections and
+    rerun the setup pragmas each time. Connections are instead borrowed for
+    one operation and put back; at most size exist, and callers beyond that
+    wait for one to be returned. Under gevent's monkey patching the queue and
+    semaphore yield to other greenlets instead of blocking the worker.
+    """
+
+    def __init__(self, path, size=8, timeout=5, setup=(), row_factory=None):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.setup = setup
+        self.row_factory = row_factory
+        self.opened = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # Borrowed connections move between threads, but only one holds each at a time
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = self.row_factory
+        for statement in self.setup:
+            conn.execute(statement)
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of the with block"""
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open()
+            try:
+                yield conn
+            finally:
+                # Never hand out a connection with a transaction left open
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.put(conn)
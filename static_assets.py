@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing; images and archives are already compressed
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml", "application/xml")
+
+# Bodies smaller than this gain nothing from compression
+MIN_COMPRESS_BYTES = 256
+
+
+def _compressors():
+    """Return (encoding, compress) pairs, best ratio first"""
+    compressors = []
+    if brotli is not None:
+        compressors.append(("br", lambda data: brotli.compress(data, quality=11)))
+    compressors.append(("gzip", lambda data: gzip.compress(data, compresslevel=9, mtime=0)))
+    return compressors
+
+
+class Asset:
+    """An unchanging response body with precompressed variants and strong ETags
+
+    Each variant gets its own ETag, derived from the content hash and the
+    encoding, since byte-for-byte different representations must not share
+    a strong validator.
+    """
+
+    def __init__(self, data, mimetype, cache_control):
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        self.variants = {None: (data, f'"{digest}"')}
+        if len(data) >= MIN_COMPRESS_BYTES and mimetype.startswith(COMPRESSIBLE_TYPES):
+            for encoding, compress in _compressors():
+                compressed = compress(data)
+                if len(compressed) < len(data):
+                    self.variants[encoding] = (compressed, f'"{digest}-{encoding}"')
+
+    @classmethod
+    def from_file(cls, path, cache_control):
+        mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        with open(path, 'rb') as f:
+            return cls(f.read(), mimetype, cache_control)
+
+    def select(self, accept_encodings):
+        """Return the encoding to send for a parsed Accept-Encoding header, or None for identity"""
+        best, best_quality = None, 0
+        for encoding in self.variants:
+            if encoding is not None:
+                quality = accept_encodings[encoding]
+                # Variants are ordered by compression ratio, so ties keep the earlier one
+                if quality > best_quality:
+                    best, best_quality = encoding, quality
+        return best
+
+    def response(self, request):
+        """Build the response for a request, answering 304 when its validator still matches"""
+        encoding = self.select(request.accept_encodings)
+        data, etag = self.variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if len(self.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None and _matches(if_none_match, etag):
+            return Response(status=304, headers=headers)
+        return Response(data, mimetype=self.mimetype, headers=headers)
+
+
+def _matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag, as RFC 9110 requires for GET"""
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+class StaticAssets:
+    """Files of a directory loaded and compressed once, served from memory
+
+    Files larger than max_file_bytes are left out and should be served from
+    disk instead.
+    """
+
+    def __init__(self, directory, cache_control, html_cache_control, max_file_bytes=1024 * 1024):
+        self.directory = directory
+        self._assets = {}
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.getsize(path) > max_file_bytes:
+                    continue
+                relative = os.path.relpath(path, directory).replace(os.sep, "/")
+                policy = html_cache_control if name.endswith((".html", ".htm")) else cache_control
+                self._assets[relative] = Asset.from_file(path, policy)
+
+    def get(self, path):
+        return self._assets.get(path)
+
+    def __len__(self):
+        return len(self._assets)
+
+    def stats(self):
+        """Return the number of assets and the encodings available for them"""
+        return {
+            "assets": len(self._assets),
+            "encodings": [encoding for encoding, _ in _compressors()],
+            "bytes": sum(len(asset.variants[None][0]) for asset in self._assets.values())
+        }